@@ -1,12 +1,17 @@
 import logging
 import asyncio
 import csv
+import re
+import tempfile
+from collections import defaultdict
 from datetime import datetime, time, timezone, timedelta
-from io import StringIO, BytesIO
+from io import StringIO, TextIOWrapper
+from typing import Tuple
 
-import pandas as pd
+import numpy as np
 import pytz
 from telegram import Update, InputFile, InlineKeyboardButton, InlineKeyboardMarkup
+from telegram.constants import MessageLimit
 from telegram.ext import CallbackContext
 
 from config import BIRDEYE_API_KEY
@@ -19,57 +24,187 @@ from solana_helpers import (
 )
 from monitoring import MONITOR_TASKS, start_monitoring_task
 from chart_generator import create_daily_volume_chart
-from solana_client import AsyncCustomSolanaClient
+from solana_client import get_solana_client
 
 logger = logging.getLogger(__name__)
 
+# bot_data key of the job_name -> Job index of scheduled scans.
+SCHEDULED_JOBS_KEY = "scheduled_jobs"
+
+# --- Message templates ---
+
+_TOKENINFO_TEMPLATE = (
+    "✅ **Token Information:** `{address}`\n\n"
+    "🪙 **Total Supply:** `{supply}`\n"
+    "🔬 **Decimals:** `{decimals}`\n"
+    "🔑 **Mint Authority:** `{mint_authority}`"
+)
+_FREEZE_AUTHORITY_TEMPLATE = "\n❄️ **Freeze Authority:** `{freeze_authority}`"
+
+_TOKEN_STATS_TEMPLATE = (
+    "\n\n**Statistics:**\n"
+    "▫️ **Total Volume:** `{total_volume:,.2f}`\n"
+    "▫️ **Transactions:** `{num_transactions}`\n"
+    "▫️ **Avg. Tx Size:** `{avg_tx_size:,.2f}`"
+)
+_WALLET_STATS_TEMPLATE = (
+    "\n\n**Statistics:**\n"
+    "➡️ **Total Incoming:** `{total_incoming:,.2f}` in `{num_incoming_tx}` txs\n"
+    "⬅️ **Total Outgoing:** `{total_outgoing:,.2f}` in `{num_outgoing_tx}` txs\n"
+    "📈 **Net Flow:** `{net_flow:,.2f}`"
+)
+
+_PRICE_TEMPLATE = "📊 **Price for {symbol}** (`{address}`)\n\n   - **Price:** `${value:,.8f}`"
+
+_SCAN_MODE_TEMPLATES = {
+    'limit': "with a limit of `{limit}` transactions",
+    'chart_limit': "based on the last `{limit}` transactions",
+    'blocks': "in the block range from `{start_block}` to `{end_block}`",
+    'date': "for the date `{start_date:%Y-%m-%d}`",
+    'date_range': "for the period from `{start_date:%Y-%m-%d}` to `{end_date:%Y-%m-%d}`",
+}
+_SCAN_STARTED_TEMPLATE = "🔍 **Starting scan...**\n**Address:** `{address}`\n**Mode:** {mode}.\n\nPlease wait."
+_CHART_STARTED_TEMPLATE = "📊 **Generating chart...**\n**Address:** `{address}`\n**Mode:** {mode}.\n\nPlease wait, this may take a moment."
+
 
 # --- UI / Keyboards ---
+# The menus are static and telegram objects are immutable, so each one is built once and shared.
 
-def get_main_menu_keyboard():
-    """Returns the main menu keyboard."""
+_MAIN_MENU_KEYBOARD = InlineKeyboardMarkup([
+    [InlineKeyboardButton("🔍 Scan Transactions", callback_data='scan_wallet')],
+    [InlineKeyboardButton("💰 Wallet Balance", callback_data='balance_wallet')],
+    [InlineKeyboardButton("📊 Chart Wallet", callback_data='chart_wallet')],
+    [InlineKeyboardButton("💹 Token Price", callback_data='price_token')],
+    [InlineKeyboardButton("ℹ️ Token Info", callback_data='tokeninfo')],
+    [InlineKeyboardButton("⚙️ Settings", callback_data='settings_menu')],
+    [InlineKeyboardButton("❓ Help", callback_data='help')]
+])
+
+_SETTINGS_MENU_KEYBOARD = InlineKeyboardMarkup([
+    [InlineKeyboardButton("🗂 Manage Addresses", callback_data='manage_addresses')],
+    [InlineKeyboardButton("📡 Manage Monitors", callback_data='manage_monitors')],
+    [InlineKeyboardButton("⏰ Manage Schedules", callback_data='manage_schedules')],
+    [InlineKeyboardButton("🔌 RPC Settings", callback_data='manage_rpc')],
+    [InlineKeyboardButton("⬅️ Back", callback_data='main_menu')]
+])
+
+_BACK_TO_SETTINGS_KEYBOARD = InlineKeyboardMarkup([[InlineKeyboardButton("⬅️ Back to Settings", callback_data='settings_menu')]])
+
+_BACK_TO_MAIN_MENU_KEYBOARD = InlineKeyboardMarkup([[InlineKeyboardButton("⬅️ Back to Main Menu", callback_data='main_menu')]])
+
+
+def _build_scan_options_keyboard(action_prefix: str) -> InlineKeyboardMarkup:
     keyboard = [
-        [InlineKeyboardButton("🔍 Scan Transactions", callback_data='scan_wallet')],
-        [InlineKeyboardButton("💰 Wallet Balance", callback_data='balance_wallet')],
-        [InlineKeyboardButton("📊 Chart Wallet", callback_data='chart_wallet')],
-        [InlineKeyboardButton("💹 Token Price", callback_data='price_token')],
-        [InlineKeyboardButton("ℹ️ Token Info", callback_data='tokeninfo')],
-        [InlineKeyboardButton("⚙️ Settings", callback_data='settings_menu')],
-        [InlineKeyboardButton("❓ Help", callback_data='help')]
+        [InlineKeyboardButton("Last 100 Transactions", callback_data=f'{action_prefix}_limit_100')],
+        [InlineKeyboardButton("Set Custom Limit", callback_data=f'{action_prefix}_limit')],
+        [InlineKeyboardButton("By Date", callback_data=f'{action_prefix}_date')],
+        [InlineKeyboardButton("By Block Range", callback_data=f'{action_prefix}_blocks')],
+        [InlineKeyboardButton("⬅️ Back", callback_data='main_menu')]
     ]
     return InlineKeyboardMarkup(keyboard)
 
+
+_SCAN_OPTIONS_KEYBOARDS = {prefix: _build_scan_options_keyboard(prefix) for prefix in ('scan', 'chart')}
+
+
+def get_main_menu_keyboard():
+    """Returns the main menu keyboard."""
+    return _MAIN_MENU_KEYBOARD
+
 def get_settings_menu_keyboard():
     """Returns the settings menu keyboard."""
-    keyboard = [
-        [InlineKeyboardButton("🗂 Manage Addresses", callback_data='manage_addresses')],
-        [InlineKeyboardButton("📡 Manage Monitors", callback_data='manage_monitors')],
-        [InlineKeyboardButton("⏰ Manage Schedules", callback_data='manage_schedules')],
-        [InlineKeyboardButton("🔌 RPC Settings", callback_data='manage_rpc')],
-        [InlineKeyboardButton("⬅️ Back", callback_data='main_menu')]
-    ]
-    return InlineKeyboardMarkup(keyboard)
+    return _SETTINGS_MENU_KEYBOARD
 
 def get_back_to_settings_keyboard():
     """Returns a keyboard with a 'Back to settings' button."""
-    keyboard = [[InlineKeyboardButton("⬅️ Back to Settings", callback_data='settings_menu')]]
-    return InlineKeyboardMarkup(keyboard)
+    return _BACK_TO_SETTINGS_KEYBOARD
 
 
 def get_scan_options_keyboard(action_prefix: str):
     """Returns a keyboard with scan/chart options."""
-    keyboard = [
-        [InlineKeyboardButton("Last 100 Transactions", callback_data=f'{action_prefix}_limit_100')],
-        [InlineKeyboardButton("Set Custom Limit", callback_data=f'{action_prefix}_limit')],
-        [InlineKeyboardButton("By Date", callback_data=f'{action_prefix}_date')],
-        [InlineKeyboardButton("By Block Range", callback_data=f'{action_prefix}_blocks')],
-        [InlineKeyboardButton("⬅️ Back", callback_data='main_menu')]
-    ]
-    return InlineKeyboardMarkup(keyboard)
+    keyboard = _SCAN_OPTIONS_KEYBOARDS.get(action_prefix)
+    return keyboard if keyboard is not None else _build_scan_options_keyboard(action_prefix)
 
 
 # --- Core Logic Functions (for reuse) ---
 
+# Base58 public key: 32-44 characters, no 0, O, I or l.
+_SOLANA_ADDRESS_RE = re.compile(r'[1-9A-HJ-NP-Za-km-z]{32,44}')
+
+# Added to a day's midnight to get the last microsecond of that day.
+_END_OF_DAY_OFFSET = timedelta(days=1, microseconds=-1)
+
+
+def _parse_utc_date(value: str) -> datetime:
+    """Parses a `YYYY-MM-DD` string into midnight UTC of that day."""
+    return datetime.strptime(value, '%Y-%m-%d').replace(tzinfo=timezone.utc)
+
+
+_CSV_SPOOL_MAX_SIZE = 16 * 1024 * 1024
+_CSV_FIELDNAMES = ('type', 'wallet_1', 'wallet_2', 'amount', 'authority', 'timestamp', 'signature', 'block_number', 'link')
+
+
+def _parse_scan_args(args: list, limit_mode_msg: str) -> Tuple[dict, str]:
+    """Parses the `--limit`/`--blocks`/`--date` option shared by /scan and /chart.
+
+    Returns the keyword arguments for the executor and a description of the scan mode.
+    Raises ValueError with a user-facing message on malformed input.
+    """
+    param = args[1] if len(args) > 1 else None
+    value = args[2] if len(args) > 2 else None
+
+    if param == '--blocks' and value and '-' in value:
+        try:
+            start_str, end_str = value.split('-')
+            params = {'limit': None, 'start_block': int(start_str), 'end_block': int(end_str)}
+        except ValueError:
+            raise ValueError("❌ Invalid block format. Use: `--blocks START-END`.") from None
+        return params, _SCAN_MODE_TEMPLATES['blocks'].format_map(params)
+
+    if param == '--date' and value:
+        try:
+            date_parts = value.split(':')
+            if len(date_parts) == 1:
+                start_date = _parse_utc_date(date_parts[0])
+                end_date = start_date + _END_OF_DAY_OFFSET
+                mode = 'date'
+            elif len(date_parts) == 2:
+                start_date = _parse_utc_date(date_parts[0])
+                end_date = _parse_utc_date(date_parts[1]) + _END_OF_DAY_OFFSET
+                mode = 'date_range'
+            else:
+                raise ValueError("Invalid date format")
+        except ValueError:
+            raise ValueError("❌ Invalid date format. Use: `--date YYYY-MM-DD` or `--date YYYY-MM-DD:YYYY-MM-DD`.") from None
+        params = {'limit': None, 'start_date': start_date, 'end_date': end_date}
+        return params, _SCAN_MODE_TEMPLATES[mode].format_map(params)
+
+    limit = 100
+    if param == '--limit' and value and value.isdigit():
+        limit = int(value)
+    return {'limit': limit}, limit_mode_msg.format(limit=limit)
+
+
+def _build_csv_file(transactions: list) -> tempfile.SpooledTemporaryFile:
+    """Writes transactions as UTF-8 CSV to a spool file, rewound for reading; the caller closes it.
+
+    The spool stays in memory up to `_CSV_SPOOL_MAX_SIZE` and moves to disk past that.
+    """
+    csv_file = tempfile.SpooledTemporaryFile(max_size=_CSV_SPOOL_MAX_SIZE, mode='w+b')
+    try:
+        # Rows are encoded straight into the spool file instead of StringIO -> str -> bytes copies.
+        output = TextIOWrapper(csv_file, encoding='utf-8', newline='', write_through=True)
+        writer = csv.writer(output)
+        writer.writerow(_CSV_FIELDNAMES)
+        writer.writerows([tx.get(field, '') for field in _CSV_FIELDNAMES] for tx in transactions)
+        output.detach()  # Keep csv_file open for the upload
+    except Exception:
+        csv_file.close()
+        raise
+    csv_file.seek(0)
+    return csv_file
+
+
 async def _execute_scan(update: Update, context: CallbackContext, address: str, limit: int = 100, start_block: int = None, end_block: int = None, start_date: datetime = None, end_date: datetime = None):
     """Core logic to perform a scan and send the results."""
     chat_id = update.effective_chat.id
@@ -81,20 +216,17 @@ async def _execute_scan(update: Update, context: CallbackContext, address: str,
             await context.bot.send_message(chat_id, "✅ No transactions found for the specified address, or an error occurred.")
             return
 
-        output = StringIO()
-        fieldnames = ['type', 'wallet_1', 'wallet_2', 'amount', 'authority', 'timestamp', 'signature', 'block_number', 'link']
-        writer = csv.DictWriter(output, fieldnames=fieldnames)
-        writer.writeheader()
-        writer.writerows(transactions)
-        
-        csv_data = BytesIO(output.getvalue().encode('utf-8'))
+        # Serializing large scans is CPU-bound, keep it off the event loop.
+        csv_file = await asyncio.to_thread(_build_csv_file, transactions)
         csv_filename = f"transactions_{address[:10]}.csv"
 
-        await context.bot.send_document(
-            chat_id=chat_id,
-            document=InputFile(csv_data, filename=csv_filename),
-            caption=f"✅ **Scan complete.**\nFound transactions for address `{address}`."
-        )
+        # read_file_handle=False streams the spool file into the upload instead of reading it into bytes first.
+        with csv_file:
+            await context.bot.send_document(
+                chat_id=chat_id,
+                document=InputFile(csv_file, filename=csv_filename, read_file_handle=False),
+                caption=f"✅ **Scan complete.**\nFound transactions for address `{address}`."
+            )
     except Exception as e:
         logger.error(f"Error in _execute_scan: {e}")
         await context.bot.send_message(chat_id, f"❌ An error occurred during the scan: {e}")
@@ -106,6 +238,9 @@ async def _execute_balance(update: Update, context: CallbackContext, address: st
     rpc_url = get_rpc_url(chat_id)
     msg = await context.bot.send_message(chat_id, f"⏳ Requesting balance for `{address}`...", parse_mode='Markdown')
     balance_message = await get_wallet_balance(address, rpc_url, BIRDEYE_API_KEY)
+    if len(balance_message) <= MessageLimit.MAX_TEXT_LENGTH:
+        await context.bot.edit_message_text(chat_id=chat_id, message_id=msg.message_id, text=balance_message, parse_mode='Markdown')
+        return
     await context.bot.delete_message(chat_id=chat_id, message_id=msg.message_id)
     await send_long_message(context, chat_id, balance_message, parse_mode='Markdown')
 
@@ -131,16 +266,57 @@ async def _execute_tokeninfo(update: Update, context: CallbackContext, address:
         await context.bot.send_message(chat_id, "❌ Could not find information. Please ensure this is an SPL token mint address.")
         return
 
-    message_lines = [
-        f"✅ **Token Information:** `{address}`\n",
-        f"🪙 **Total Supply:** `{details.get('supply', 'N/A')}`",
-        f"🔬 **Decimals:** `{details.get('decimals', 'N/A')}`",
-        f"🔑 **Mint Authority:** `{details.get('mint_authority', 'N/A')}`"
-    ]
+    message = _TOKENINFO_TEMPLATE.format_map(defaultdict(lambda: 'N/A', details, address=address))
     if 'freeze_authority' in details:
-        message_lines.append(f"❄️ **Freeze Authority:** `{details.get('freeze_authority', 'N/A')}`")
+        message += _FREEZE_AUTHORITY_TEMPLATE.format(freeze_authority=details['freeze_authority'])
+
+    await context.bot.send_message(chat_id, message, parse_mode='Markdown')
+
+
+def _to_float(value) -> float:
+    """Converts an amount to float, mapping anything unparsable to NaN."""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return float('nan')
+
+
+def _compute_chart_stats(transactions: list, address: str, token_accounts: list, is_token_mint: bool) -> str:
+    """Builds the statistics block of the chart caption directly from the transaction dicts."""
+    # Unparsable amounts become NaN so the array stays aligned with the wallet columns below.
+    amounts = np.fromiter((_to_float(tx.get('amount')) for tx in transactions), dtype=np.float64, count=len(transactions))
+    valid = ~np.isnan(amounts)
+    if not valid.any():
+        return ""
+
+    if is_token_mint:
+        total_volume = amounts[valid].sum()
+        num_transactions = int(valid.sum())
+        return _TOKEN_STATS_TEMPLATE.format(
+            total_volume=total_volume,
+            num_transactions=num_transactions,
+            avg_tx_size=total_volume / num_transactions
+        )
+
+    address_stripped = address.strip()
+    token_accounts_arr = np.asarray(token_accounts, dtype=object)
+    w1 = np.array([tx.get('wallet_1') or '' for tx in transactions], dtype=object)
+    w2 = np.array([tx.get('wallet_2') or '' for tx in transactions], dtype=object)
+    auth = np.array([tx.get('authority') or '' for tx in transactions], dtype=object)
+
+    incoming_mask = valid & ((w2 == address_stripped) | np.isin(w2, token_accounts_arr))
+    outgoing_mask = valid & ((w1 == address_stripped) | (auth == address_stripped))
+
+    total_incoming = amounts[incoming_mask].sum()
+    total_outgoing = amounts[outgoing_mask].sum()
 
-    await context.bot.send_message(chat_id, "\n".join(message_lines), parse_mode='Markdown')
+    return _WALLET_STATS_TEMPLATE.format(
+        total_incoming=total_incoming,
+        num_incoming_tx=int(incoming_mask.sum()),
+        total_outgoing=total_outgoing,
+        num_outgoing_tx=int(outgoing_mask.sum()),
+        net_flow=total_incoming - total_outgoing
+    )
 
 
 async def _execute_chart(update: Update, context: CallbackContext, address: str, limit: int = 100, start_block: int = None, end_block: int = None, start_date: datetime = None, end_date: datetime = None, transactions: list = None):
@@ -148,74 +324,42 @@ async def _execute_chart(update: Update, context: CallbackContext, address: str,
     chat_id = update.effective_chat.id
     rpc_url = get_rpc_url(chat_id)
     try:
+        # The mint lookup doesn't depend on the history, so run both RPC round-trips together.
         if transactions is None:
-            transactions = await fetch_and_parse_transactions(address, rpc_url, limit=limit, start_block=start_block, end_block=end_block, start_date=start_date, end_date=end_date)
+            transactions, token_details = await asyncio.gather(
+                fetch_and_parse_transactions(address, rpc_url, limit=limit, start_block=start_block, end_block=end_block, start_date=start_date, end_date=end_date),
+                get_token_details(address, rpc_url)
+            )
+        else:
+            token_details = await get_token_details(address, rpc_url)
 
         if not transactions:
             await context.bot.send_message(chat_id, "✅ No transactions found for the specified address or parameters.")
             return
 
-        token_details = await get_token_details(address, rpc_url)
         is_token_mint = token_details.get('decimals') is not None
         
         token_accounts = []
         if not is_token_mint:
             try:
-                async with AsyncCustomSolanaClient(rpc_url) as client:
-                    token_accounts_res = await client.get_token_accounts_by_owner(address)
-                    if token_accounts_res and "result" in token_accounts_res and token_accounts_res["result"].get("value"):
-                        token_accounts = [acc["pubkey"] for acc in token_accounts_res["result"]["value"]]
+                token_accounts_res = await get_solana_client(rpc_url).get_token_accounts_by_owner(address)
+                if token_accounts_res and "result" in token_accounts_res and token_accounts_res["result"].get("value"):
+                    token_accounts = [acc["pubkey"] for acc in token_accounts_res["result"]["value"]]
             except Exception as e:
                 logger.error(f"Could not fetch token accounts for wallet {address}: {e}")
         
         # Calculate statistics for the caption
-        stats_caption = ""
         try:
-            df = pd.DataFrame(transactions)
-            df['amount'] = pd.to_numeric(df['amount'], errors='coerce')
-            df.dropna(subset=['amount'], inplace=True)
-
-            if not df.empty:
-                if is_token_mint:
-                    total_volume = df['amount'].sum()
-                    num_transactions = len(df)
-                    avg_tx_size = total_volume / num_transactions if num_transactions > 0 else 0
-                    stats_caption = (
-                        f"\n\n**Statistics:**\n"
-                        f"▫️ **Total Volume:** `{total_volume:,.2f}`\n"
-                        f"▫️ **Transactions:** `{num_transactions}`\n"
-                        f"▫️ **Avg. Tx Size:** `{avg_tx_size:,.2f}`"
-                    )
-                else: # is_wallet
-                    address_stripped = address.strip()
-                    token_accounts_set = set(token_accounts)
-                    
-                    df['wallet_1'] = df.get('wallet_1', pd.Series(dtype=str)).fillna('')
-                    df['wallet_2'] = df.get('wallet_2', pd.Series(dtype=str)).fillna('')
-                    if 'authority' not in df.columns:
-                        df['authority'] = ''
-                    df['authority'] = df['authority'].fillna('')
-
-                    incoming_mask = df.apply(lambda row: row['wallet_2'] == address_stripped or row['wallet_2'] in token_accounts_set, axis=1)
-                    outgoing_mask = df.apply(lambda row: row['wallet_1'] == address_stripped or row['authority'] == address_stripped, axis=1)
-
-                    total_incoming = df.loc[incoming_mask, 'amount'].sum()
-                    total_outgoing = df.loc[outgoing_mask, 'amount'].sum()
-                    net_flow = total_incoming - total_outgoing
-                    num_incoming_tx = int(incoming_mask.sum())
-                    num_outgoing_tx = int(outgoing_mask.sum())
-
-                    stats_caption = (
-                        f"\n\n**Statistics:**\n"
-                        f"➡️ **Total Incoming:** `{total_incoming:,.2f}` in `{num_incoming_tx}` txs\n"
-                        f"⬅️ **Total Outgoing:** `{total_outgoing:,.2f}` in `{num_outgoing_tx}` txs\n"
-                        f"📈 **Net Flow:** `{net_flow:,.2f}`"
-                    )
+            stats_caption = _compute_chart_stats(transactions, address, token_accounts, is_token_mint)
         except Exception as e:
             logger.warning(f"Could not generate statistics for chart caption: {e}")
             stats_caption = ""
 
-        chart_image = create_daily_volume_chart(transactions, address, token_accounts, is_token_mint)
+        chart_pool = context.bot_data.get("chart_pool")
+        if chart_pool is not None:
+            chart_image = await asyncio.get_running_loop().run_in_executor(chart_pool, create_daily_volume_chart, transactions, address, token_accounts, is_token_mint)
+        else:
+            chart_image = await asyncio.to_thread(create_daily_volume_chart, transactions, address, token_accounts, is_token_mint)
 
         if not chart_image:
             await context.bot.send_message(chat_id, "📉 Not enough data to create a chart. Please try a different range.")
@@ -340,43 +484,47 @@ async def text_handler(update: Update, context: CallbackContext) -> None:
 
         try:
             params = {}
-            scan_mode_msg = ""
+            mode = None
             if state == f'awaiting_limit_for_{action}':
-                if not text.isdigit() or int(text) <= 0:
+                try:
+                    params['limit'] = int(text)
+                except ValueError:
+                    params['limit'] = 0
+                if params['limit'] <= 0:
                     await update.message.reply_text("❌ Invalid format. Please enter a positive number.")
                     return
-                params['limit'] = int(text)
-                scan_mode_msg = f"with a limit of `{params['limit']}` transactions"
+                mode = 'limit'
 
             elif state == f'awaiting_date_for_{action}':
                 date_parts = text.split(':')
                 if len(date_parts) == 1:
-                    params['start_date'] = datetime.strptime(date_parts[0], '%Y-%m-%d').replace(tzinfo=timezone.utc)
-                    params['end_date'] = params['start_date'] + timedelta(days=1) - timedelta(microseconds=1)
-                    scan_mode_msg = f"for the date `{params['start_date'].strftime('%Y-%m-%d')}`"
+                    params['start_date'] = _parse_utc_date(date_parts[0])
+                    params['end_date'] = params['start_date'] + _END_OF_DAY_OFFSET
+                    mode = 'date'
                 elif len(date_parts) == 2:
-                    params['start_date'] = datetime.strptime(date_parts[0], '%Y-%m-%d').replace(tzinfo=timezone.utc)
-                    params['end_date'] = datetime.strptime(date_parts[1], '%Y-%m-%d').replace(tzinfo=timezone.utc) + timedelta(days=1) - timedelta(microseconds=1)
-                    scan_mode_msg = f"for the period from `{params['start_date'].strftime('%Y-%m-%d')}` to `{params['end_date'].strftime('%Y-%m-%d')}`"
+                    params['start_date'] = _parse_utc_date(date_parts[0])
+                    params['end_date'] = _parse_utc_date(date_parts[1]) + _END_OF_DAY_OFFSET
+                    mode = 'date_range'
                 else:
                     raise ValueError("Invalid date format")
             
             elif state == f'awaiting_blocks_for_{action}':
                 block_parts = text.split('-')
-                if len(block_parts) != 2 or not block_parts[0].isdigit() or not block_parts[1].isdigit():
-                     raise ValueError("Invalid block format")
-                params['start_block'] = int(block_parts[0])
-                params['end_block'] = int(block_parts[1])
-                scan_mode_msg = f"in the block range from `{params['start_block']}` to `{params['end_block']}`"
+                if len(block_parts) != 2:
+                    raise ValueError("Invalid block format")
+                params['start_block'], params['end_block'] = int(block_parts[0]), int(block_parts[1])
+                mode = 'blocks'
+
+            scan_mode_msg = _SCAN_MODE_TEMPLATES[mode].format_map(params) if mode else ""
 
             # Clean up user_data and execute
             context.user_data.clear()
             
             if action == 'scan':
-                await update.message.reply_text(f"🔍 **Starting scan...**\n**Address:** `{address}`\n**Mode:** {scan_mode_msg}.\n\nPlease wait.", parse_mode='Markdown')
+                await update.message.reply_text(_SCAN_STARTED_TEMPLATE.format(address=address, mode=scan_mode_msg), parse_mode='Markdown')
                 await _execute_scan(update, context, address, **params)
             elif action == 'chart':
-                await update.message.reply_text(f"📊 **Generating chart...**\n**Address:** `{address}`\n**Mode:** {scan_mode_msg}.\n\nPlease wait.", parse_mode='Markdown')
+                await update.message.reply_text(_CHART_STARTED_TEMPLATE.format(address=address, mode=scan_mode_msg), parse_mode='Markdown')
                 await _execute_chart(update, context, address, **params)
 
         except (ValueError, IndexError):
@@ -416,22 +564,25 @@ async def settings_menu(update: Update, context: CallbackContext):
 
 async def send_long_message(context: CallbackContext, chat_id: int, text: str, **kwargs):
     """Sends a long message by splitting it into parts without breaking lines."""
-    MAX_LENGTH = 4096
+    MAX_LENGTH = MessageLimit.MAX_TEXT_LENGTH
     if len(text) <= MAX_LENGTH:
         await context.bot.send_message(chat_id=chat_id, text=text, **kwargs)
         return
 
-    lines = text.split('\n')
-    message_part = ""
-    for line in lines:
-        if len(message_part) + len(line) + 1 > MAX_LENGTH:
-            await context.bot.send_message(chat_id=chat_id, text=message_part, **kwargs)
-            message_part = ""
-        
-        message_part += line + "\n"
-    
-    if message_part:
-        await context.bot.send_message(chat_id=chat_id, text=message_part, **kwargs)
+    parts = []
+    current, current_len = [], 0
+    for line in text.split('\n'):
+        line_len = len(line) + 1
+        if current and current_len + line_len > MAX_LENGTH:
+            parts.append('\n'.join(current))
+            current, current_len = [], 0
+        current.append(line)
+        current_len += line_len
+    if current:
+        parts.append('\n'.join(current))
+
+    for part in parts:
+        await context.bot.send_message(chat_id=chat_id, text=part, **kwargs)
 
 
 async def start(update: Update, context: CallbackContext) -> None:
@@ -478,7 +629,7 @@ async def help_command(update: Update, context: CallbackContext, from_button: bo
         "To cancel the current operation, type /cancel."
     )
     
-    keyboard = InlineKeyboardMarkup([[InlineKeyboardButton("⬅️ Back to Main Menu", callback_data='main_menu')]])
+    keyboard = _BACK_TO_MAIN_MENU_KEYBOARD
 
     if from_button:
         await update.callback_query.edit_message_text(help_text, reply_markup=keyboard, parse_mode='Markdown')
@@ -510,13 +661,7 @@ def format_price_info(token_address: str, price_data: dict) -> str:
     if value is None:
         return f"❌ Could not fetch price for `{token_address}`."
 
-    symbol = price_info.get("symbol", "N/A")
-    
-    message = (
-        f"📊 **Price for {symbol}** (`{token_address}`)\n\n"
-        f"   - **Price:** `${value:,.8f}`"
-    )
-    return message
+    return _PRICE_TEMPLATE.format(symbol=price_info.get("symbol", "N/A"), address=token_address, value=value)
 
 
 async def price(update: Update, context: CallbackContext) -> None:
@@ -543,7 +688,7 @@ async def monitor(update: Update, context: CallbackContext) -> None:
     alias_or_address = args[0]
     address = resolve_address(chat_id, alias_or_address)
     
-    if len(address) < 32 or len(address) > 45:
+    if not _SOLANA_ADDRESS_RE.fullmatch(address):
         await update.message.reply_text("❌ Invalid Solana address.", parse_mode='Markdown')
         return
 
@@ -561,7 +706,7 @@ async def monitor(update: Update, context: CallbackContext) -> None:
     MONITOR_TASKS[(chat_id, address)] = task
     
     data[str(chat_id)]["monitors"][address] = alias_or_address
-    save_user_data(data)
+    await save_user_data(data)
     
     await update.message.reply_text(f"📡 **Starting monitoring** for wallet `{address}`. You will receive notifications for new transactions.", parse_mode='Markdown')
 
@@ -585,7 +730,7 @@ async def unmonitor(update: Update, context: CallbackContext) -> None:
     data = load_user_data()
     if str(chat_id) in data and "monitors" in data[str(chat_id)] and address in data[str(chat_id)]["monitors"]:
         del data[str(chat_id)]["monitors"][address]
-        save_user_data(data)
+        await save_user_data(data)
         await update.message.reply_text(f"🛑 Monitoring for `{address}` has been stopped.", parse_mode='Markdown')
     else:
         await update.message.reply_text(f"❌ Address `{address}` is not being monitored.", parse_mode='Markdown')
@@ -640,7 +785,7 @@ async def scheduled_scan_callback(context: CallbackContext):
     last_signature = schedule_info.get("last_signature")
 
     rpc_url = get_rpc_url(chat_id)
-    transactions, new_last_signature = await fetch_and_parse_new_transactions(address, rpc_url, last_signature)
+    transactions, new_last_signature = await fetch_and_parse_new_transactions(address, rpc_url, last_signature, use_cache=True)
 
     if not transactions:
         await context.bot.send_message(chat_id, f"✅ No new transactions found for `{alias}`.", parse_mode='Markdown')
@@ -648,25 +793,46 @@ async def scheduled_scan_callback(context: CallbackContext):
 
     if new_last_signature and new_last_signature != last_signature:
         user_data[str(chat_id)]["schedules"][alias]["last_signature"] = new_last_signature
-        save_user_data(user_data)
+        await save_user_data(user_data)
         logger.info(f"Updated last signature for {alias} (chat {chat_id}) to {new_last_signature}")
 
-    output = StringIO()
-    fieldnames = ['type', 'wallet_1', 'wallet_2', 'amount', 'authority', 'timestamp', 'signature', 'block_number', 'link']
-    writer = csv.DictWriter(output, fieldnames=fieldnames)
-    writer.writeheader()
-    writer.writerows(transactions)
-    
-    csv_data = BytesIO(output.getvalue().encode('utf-8'))
+    csv_file = await asyncio.to_thread(_build_csv_file, transactions)
     csv_filename = f"scheduled_scan_{alias}_{datetime.now().strftime('%Y%m%d_%H%M')}.csv"
 
-    await context.bot.send_document(
+    with csv_file:
+        await context.bot.send_document(
+            chat_id=chat_id,
+            document=InputFile(csv_file, filename=csv_filename, read_file_handle=False),
+            caption=f"📄 **New transactions found for `{alias}`!**"
+        )
+
+
+def schedule_scan_job(job_queue, bot_data: dict, chat_id: int, alias: str, address: str, scan_time: time):
+    """Registers the daily scan job for an alias, replacing any existing one.
+
+    Jobs are indexed by name in bot_data so they can be found without scanning the job queue.
+    """
+    job_name = f"scan_{chat_id}_{alias}"
+    _remove_scan_job(bot_data, chat_id, alias)
+    bot_data.setdefault(SCHEDULED_JOBS_KEY, {})[job_name] = job_queue.run_daily(
+        scheduled_scan_callback,
+        time=scan_time,
         chat_id=chat_id,
-        document=InputFile(csv_data, filename=csv_filename),
-        caption=f"📄 **New transactions found for `{alias}`!**"
+        user_id=chat_id,
+        name=job_name,
+        data={"chat_id": chat_id, "alias": alias, "address": address}
     )
 
 
+def _remove_scan_job(bot_data: dict, chat_id: int, alias: str) -> bool:
+    """Cancels the daily scan job for an alias. Returns False if there was none."""
+    job = bot_data.get(SCHEDULED_JOBS_KEY, {}).pop(f"scan_{chat_id}_{alias}", None)
+    if job is None:
+        return False
+    job.schedule_removal()
+    return True
+
+
 async def schedule(update: Update, context: CallbackContext) -> None:
     """Schedules a daily scan for a given alias."""
     chat_id = update.message.chat_id
@@ -688,20 +854,7 @@ async def schedule(update: Update, context: CallbackContext) -> None:
         await update.message.reply_text("❌ Invalid time format. Please use `HH:MM`.", parse_mode='Markdown')
         return
 
-    job_name = f"scan_{chat_id}_{alias}"
-    current_jobs = context.job_queue.get_jobs_by_name(job_name)
-    if current_jobs:
-        for job in current_jobs:
-            job.schedule_removal()
-    
-    context.job_queue.run_daily(
-        scheduled_scan_callback,
-        time=scan_time.replace(tzinfo=pytz.UTC),
-        chat_id=chat_id,
-        user_id=chat_id,
-        name=job_name,
-        data={"chat_id": chat_id, "alias": alias, "address": address}
-    )
+    schedule_scan_job(context.job_queue, context.bot_data, chat_id, alias, address, scan_time.replace(tzinfo=pytz.UTC))
 
     data = load_user_data()
     if str(chat_id) not in data:
@@ -710,7 +863,7 @@ async def schedule(update: Update, context: CallbackContext) -> None:
         data[str(chat_id)]["schedules"] = {}
     
     data[str(chat_id)]["schedules"][alias] = {"time": time_str, "address": address, "last_signature": None}
-    save_user_data(data)
+    await save_user_data(data)
 
     await update.message.reply_text(f"✅ **Done!** Daily scan for `{alias}` has been set for `{time_str}` UTC.", parse_mode='Markdown')
 
@@ -725,20 +878,14 @@ async def unschedule(update: Update, context: CallbackContext) -> None:
         return
 
     alias = args[0]
-    job_name = f"scan_{chat_id}_{alias}"
-    current_jobs = context.job_queue.get_jobs_by_name(job_name)
-
-    if not current_jobs:
+    if not _remove_scan_job(context.bot_data, chat_id, alias):
         await update.message.reply_text(f"❌ No schedule found for `{alias}`.", parse_mode='Markdown')
         return
 
-    for job in current_jobs:
-        job.schedule_removal()
-
     data = load_user_data()
     if str(chat_id) in data and "schedules" in data[str(chat_id)] and alias in data[str(chat_id)]["schedules"]:
         del data[str(chat_id)]["schedules"][alias]
-        save_user_data(data)
+        await save_user_data(data)
 
     await update.message.reply_text(f"🗑️ Schedule for `{alias}` has been removed.", parse_mode='Markdown')
 
@@ -776,47 +923,14 @@ async def scan(update: Update, context: CallbackContext) -> None:
     alias_or_address = args[0]
     address = resolve_address(chat_id, alias_or_address)
     
-    limit = 100
-    start_block, end_block = None, None
-    start_date, end_date = None, None
-    scan_mode_msg = f"with a limit of `{limit}` transactions"
-
-    if len(args) > 1:
-        param = args[1]
-        value = args[2] if len(args) > 2 else None
-
-        if param == '--limit' and value and value.isdigit():
-            limit = int(value)
-            scan_mode_msg = f"with a limit of `{limit}` transactions"
-        elif param == '--blocks' and value and '-' in value:
-            try:
-                start_str, end_str = value.split('-')
-                start_block = int(start_str)
-                end_block = int(end_str)
-                limit = None
-                scan_mode_msg = f"in the block range from `{start_block}` to `{end_block}`"
-            except (ValueError, IndexError):
-                await context.bot.send_message(chat_id, "❌ Invalid block format. Use: `--blocks START-END`.", parse_mode='Markdown')
-                return
-        elif param == '--date' and value:
-            try:
-                date_parts = value.split(':')
-                if len(date_parts) == 1:
-                    start_date = datetime.strptime(date_parts[0], '%Y-%m-%d').replace(tzinfo=timezone.utc)
-                    end_date = start_date + timedelta(days=1) - timedelta(microseconds=1)
-                    scan_mode_msg = f"for the date `{start_date.strftime('%Y-%m-%d')}`"
-                elif len(date_parts) == 2:
-                    start_date = datetime.strptime(date_parts[0], '%Y-%m-%d').replace(tzinfo=timezone.utc)
-                    end_date = datetime.strptime(date_parts[1], '%Y-%m-%d').replace(tzinfo=timezone.utc) + timedelta(days=1) - timedelta(microseconds=1)
-                    scan_mode_msg = f"for the period from `{start_date.strftime('%Y-%m-%d')}` to `{end_date.strftime('%Y-%m-%d')}`"
-                
-                limit, start_block, end_block = None, None, None
-            except ValueError:
-                await context.bot.send_message(chat_id, "❌ Invalid date format. Use: `--date YYYY-MM-DD` or `--date YYYY-MM-DD:YYYY-MM-DD`.", parse_mode='Markdown')
-                return
+    try:
+        params, scan_mode_msg = _parse_scan_args(args, _SCAN_MODE_TEMPLATES['limit'])
+    except ValueError as e:
+        await context.bot.send_message(chat_id, str(e), parse_mode='Markdown')
+        return
 
-    await context.bot.send_message(chat_id, f"🔍 **Starting scan...**\n**Address:** `{address}`\n**Mode:** {scan_mode_msg}.\n\nPlease wait.", parse_mode='Markdown')
-    await _execute_scan(update, context, address, limit=limit, start_block=start_block, end_block=end_block, start_date=start_date, end_date=end_date)
+    await context.bot.send_message(chat_id, _SCAN_STARTED_TEMPLATE.format(address=address, mode=scan_mode_msg), parse_mode='Markdown')
+    await _execute_scan(update, context, address, **params)
 
 
 async def chart(update: Update, context: CallbackContext) -> None:
@@ -846,47 +960,14 @@ async def chart(update: Update, context: CallbackContext) -> None:
         await _execute_chart(update, context, address, transactions=transactions)
     
     else:
-        limit = 100
-        start_block, end_block = None, None
-        start_date, end_date = None, None
-        scan_mode_msg = f"based on the last `{limit}` transactions"
-
-        if len(args) > 1:
-            param = args[1]
-            value = args[2] if len(args) > 2 else None
-
-            if param == '--limit' and value and value.isdigit():
-                limit = int(value)
-                scan_mode_msg = f"based on the last `{limit}` transactions"
-            elif param == '--blocks' and value and '-' in value:
-                try:
-                    start_str, end_str = value.split('-')
-                    start_block = int(start_str)
-                    end_block = int(end_str)
-                    limit = None
-                    scan_mode_msg = f"in the block range from `{start_block}` to `{end_block}`"
-                except (ValueError, IndexError):
-                    await context.bot.send_message(chat_id, "❌ Invalid block format. Use: `--blocks START-END`.", parse_mode='Markdown')
-                    return
-            elif param == '--date' and value:
-                try:
-                    date_parts = value.split(':')
-                    if len(date_parts) == 1:
-                        start_date = datetime.strptime(date_parts[0], '%Y-%m-%d').replace(tzinfo=timezone.utc)
-                        end_date = start_date + timedelta(days=1) - timedelta(microseconds=1)
-                        scan_mode_msg = f"for the date `{start_date.strftime('%Y-%m-%d')}`"
-                    elif len(date_parts) == 2:
-                        start_date = datetime.strptime(date_parts[0], '%Y-%m-%d').replace(tzinfo=timezone.utc)
-                        end_date = datetime.strptime(date_parts[1], '%Y-%m-%d').replace(tzinfo=timezone.utc) + timedelta(days=1) - timedelta(microseconds=1)
-                        scan_mode_msg = f"for the period from `{start_date.strftime('%Y-%m-%d')}` to `{end_date.strftime('%Y-%m-%d')}`"
-                    
-                    limit, start_block, end_block = None, None, None
-                except ValueError:
-                    await context.bot.send_message(chat_id, "❌ Invalid date format. Use: `--date YYYY-MM-DD` or `--date YYYY-MM-DD:YYYY-MM-DD`.", parse_mode='Markdown')
-                    return
+        try:
+            params, scan_mode_msg = _parse_scan_args(args, _SCAN_MODE_TEMPLATES['chart_limit'])
+        except ValueError as e:
+            await context.bot.send_message(chat_id, str(e), parse_mode='Markdown')
+            return
 
-        await context.bot.send_message(chat_id, f"📊 **Generating chart...**\n**Address:** `{address}`\n**Mode:** {scan_mode_msg}.\n\nPlease wait, this may take a moment.", parse_mode='Markdown')
-        await _execute_chart(update, context, address, limit=limit, start_block=start_block, end_block=end_block, start_date=start_date, end_date=end_date)
+        await context.bot.send_message(chat_id, _CHART_STARTED_TEMPLATE.format(address=address, mode=scan_mode_msg), parse_mode='Markdown')
+        await _execute_chart(update, context, address, **params)
 
 
 async def set_rpc(update: Update, context: CallbackContext) -> None:
@@ -906,7 +987,7 @@ async def set_rpc(update: Update, context: CallbackContext) -> None:
     if str(chat_id) not in data:
         data[str(chat_id)] = {"aliases": {}, "schedules": {}}
     data[str(chat_id)]["rpc_url"] = rpc_url
-    save_user_data(data)
+    await save_user_data(data)
 
     await update.message.reply_text(f"✅ **Done!** RPC URL has been set to `{rpc_url}`.", parse_mode='Markdown')
 
@@ -936,7 +1017,7 @@ async def reset_rpc(update: Update, context: CallbackContext) -> None:
     data = load_user_data()
     if str(chat_id) in data and "rpc_url" in data[str(chat_id)]:
         del data[str(chat_id)]["rpc_url"]
-        save_user_data(data)
+        await save_user_data(data)
         await update.message.reply_text(f"✅ **Done!** RPC URL has been reset to default.", parse_mode='Markdown')
     else:
         await update.message.reply_text("ℹ️ You are already using the default RPC URL.", parse_mode='Markdown')
@@ -958,7 +1039,7 @@ async def add_address(update: Update, context: CallbackContext) -> None:
         data[str(chat_id)] = {"aliases": {}}
     
     data[str(chat_id)]["aliases"][alias] = address
-    save_user_data(data)
+    await save_user_data(data)
 
     await update.message.reply_text(f"✅ **Done!** Address `{address}` has been saved with the name `{alias}`.", parse_mode='Markdown')
 
@@ -978,7 +1059,7 @@ async def remove_address(update: Update, context: CallbackContext) -> None:
 
     if alias in user_aliases:
         del user_aliases[alias]
-        save_user_data(data)
+        await save_user_data(data)
         await update.message.reply_text(f"🗑️ Name `{alias}` has been removed.", parse_mode='Markdown')
     else:
         await update.message.reply_text(f"❌ Name `{alias}` not found.", parse_mode='Markdown')
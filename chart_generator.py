@@ -1,22 +1,65 @@
 import logging
+import threading
+import numpy as np
 import pandas as pd
+import matplotlib
+matplotlib.use('Agg')  # Только рендер в файл, без GUI-бэкенда
 import matplotlib.pyplot as plt
 import matplotlib.dates as mdates
 from matplotlib.ticker import FuncFormatter
 from io import BytesIO
 
+# pyplot keeps global state and is not thread-safe; charts are rendered from worker threads.
+_CHART_LOCK = threading.Lock()
+
+# --- Обновленный, более современный дизайн (применяется один раз при импорте) ---
+plt.style.use('seaborn-v0_8-darkgrid')
+plt.rcParams.update({
+    'figure.facecolor': '#1E1E1E', 'axes.facecolor': '#1E1E1E',
+    'text.color': '#EAEAEA', 'axes.labelcolor': '#EAEAEA',
+    'xtick.color': '#CCCCCC', 'ytick.color': '#CCCCCC',
+    'grid.color': '#444444', 'font.family': 'sans-serif',
+    'figure.dpi': 96, 'savefig.dpi': 96
+})
+
+# Форматтеры оси X создаются один раз и переиспользуются между графиками
+_HOURLY_DATE_FORMAT = mdates.DateFormatter('%d-%b %H:%M')
+_DAILY_DATE_FORMAT = mdates.DateFormatter('%d-%b-%Y')
+
+# Одна фигура на процесс, переиспользуется под _CHART_LOCK
+_FIGURE = None
+_AXES = None
+
+
+def _get_figure():
+    """Возвращает общую фигуру и оси, создавая их при первом вызове."""
+    global _FIGURE, _AXES
+    if _FIGURE is None:
+        # constrained-раскладка считается при сохранении, отдельный tight_layout не нужен
+        _FIGURE, _AXES = plt.subplots(figsize=(12, 7), layout='constrained')
+        _FIGURE.get_layout_engine().set(w_pad=0.2, h_pad=0.2)  # ~ прежний tight_layout(pad=1.5), в дюймах
+    return _FIGURE, _AXES
+
 
 def create_daily_volume_chart(transactions: list, address: str, token_accounts: list = None, is_token_mint: bool = False) -> BytesIO:
     """Создает гистограмму объема транзакций, с улучшенным дизайном и адаптивностью."""
     if not transactions:
         return None
 
+    with _CHART_LOCK:
+        return _render_daily_volume_chart(transactions, address, token_accounts, is_token_mint)
+
+
+def _render_daily_volume_chart(transactions: list, address: str, token_accounts: list, is_token_mint: bool) -> BytesIO:
+    """Рисует график; вызывается только под _CHART_LOCK."""
     try:
-        df = pd.DataFrame(transactions)
+        # Собираем только нужные колонки, без вывода типов по всем полям транзакции
+        columns = ('timestamp', 'amount') if is_token_mint else ('timestamp', 'amount', 'wallet_1', 'wallet_2', 'authority')
+        df = pd.DataFrame({col: [tx.get(col) for tx in transactions] for col in columns})
         if df.empty:
             return None
-        
-        df['timestamp'] = pd.to_datetime(df['timestamp'], errors='coerce')
+
+        df['timestamp'] = pd.to_datetime(df['timestamp'], format='ISO8601', errors='coerce')
         df['amount'] = pd.to_numeric(df['amount'], errors='coerce')
         df.dropna(subset=['amount', 'timestamp'], inplace=True)
 
@@ -28,55 +71,54 @@ def create_daily_volume_chart(transactions: list, address: str, token_accounts:
         time_span = df['timestamp'].max() - df['timestamp'].min()
         if time_span.days < 3:  # до 3 дней -> часовой
             resample_period, xlabel, title_period = 'h', 'Время', 'часовой'
-            date_format = mdates.DateFormatter('%d-%b %H:%M')
+            date_format = _HOURLY_DATE_FORMAT
         elif time_span.days <= 90:  # до 3 месяцев -> дневной
             resample_period, xlabel, title_period = 'D', 'Дата', 'дневной'
-            date_format = mdates.DateFormatter('%d-%b-%Y')
+            date_format = _DAILY_DATE_FORMAT
         else:  # более 3 месяцев -> недельный
             resample_period, xlabel, title_period = 'W', 'Неделя', 'недельный'
-            date_format = mdates.DateFormatter('%d-%b-%Y')
-
-        # --- Обновленный, более современный дизайн ---
-        plt.style.use('seaborn-v0_8-darkgrid')
-        plt.rcParams.update({
-            'figure.facecolor': '#1E1E1E', 'axes.facecolor': '#1E1E1E',
-            'text.color': '#EAEAEA', 'axes.labelcolor': '#EAEAEA',
-            'xtick.color': '#CCCCCC', 'ytick.color': '#CCCCCC',
-            'grid.color': '#444444', 'font.family': 'sans-serif',
-            'figure.dpi': 120
-        })
-        
-        fig, ax = plt.subplots(figsize=(12, 7))
+            date_format = _DAILY_DATE_FORMAT
+
+        fig, ax = _get_figure()
+        ax.cla()
         logger = logging.getLogger(__name__)
 
         # --- Логика для разных типов графиков ---
         if is_token_mint:
-            df['volume'] = df['amount']
-            summary = df.set_index('timestamp').resample(resample_period).agg({'volume': 'sum'})
-            summary = summary[summary['volume'] > 0].reset_index()
+            # Группировка по колонке напрямую, без копий через set_index/resample
+            volume = df.groupby(pd.Grouper(key='timestamp', freq=resample_period))['amount'].sum()
+            summary = volume.loc[volume > 0].rename('volume').reset_index()
             
             ax.bar(summary['timestamp'], summary['volume'], color='#3498db', label='Объем', width=0.8, edgecolor='#a9cce3', linewidth=0.6)
             ax.set_title(f'Объем торгов ({title_period}) для токена\n{address}', fontsize=16, pad=20)
 
         else: # is_wallet
             if token_accounts is None: token_accounts = []
-            token_accounts_set = set(token_accounts)
 
             # Гарантируем, что поля с адресами являются строками и не содержат None
-            df['wallet_1'] = df.get('wallet_1', pd.Series(dtype=str)).fillna('')
-            df['wallet_2'] = df.get('wallet_2', pd.Series(dtype=str)).fillna('')
-            if 'authority' not in df.columns:
-                df['authority'] = ''
-            df['authority'] = df['authority'].fillna('')
-
-            df['incoming'] = df.apply(lambda row: row['amount'] if row['wallet_2'] == address or row['wallet_2'] in token_accounts_set else 0, axis=1)
-            df['outgoing'] = df.apply(lambda row: row['amount'] if row['wallet_1'] == address or row['authority'] == address else 0, axis=1)
+            for col in ('wallet_1', 'wallet_2', 'authority'):
+                df[col] = df[col].fillna('')
+
+            # Векторная классификация вместо построчного df.apply: адреса кодируются
+            # целыми числами один раз, дальше сравниваются коды, а не строки
+            n = len(df)
+            codes, uniques = pd.factorize(pd.concat([df['wallet_1'], df['wallet_2'], df['authority']], ignore_index=True))
+            w1, w2, auth = codes[:n], codes[n:2 * n], codes[2 * n:]
+            address_code = uniques.get_indexer([address])[0]  # -1, если адреса нет в данных
+            account_codes = uniques.get_indexer(pd.Index(token_accounts, dtype=object).unique())
+            account_codes = account_codes[account_codes >= 0]
+
+            amounts = df['amount'].to_numpy(dtype=np.float64)
+            incoming_mask = (w2 == address_code) | np.isin(w2, account_codes)
+            outgoing_mask = (w1 == address_code) | (auth == address_code)
+            df['incoming'] = np.where(incoming_mask, amounts, 0.0)
+            df['outgoing'] = np.where(outgoing_mask, amounts, 0.0)
             
-            summary = df.set_index('timestamp').resample(resample_period).agg({'incoming': 'sum', 'outgoing': 'sum'})
-            summary = summary[(summary['incoming'] > 0) | (summary['outgoing'] > 0)].reset_index()
+            totals = df.groupby(pd.Grouper(key='timestamp', freq=resample_period))[['incoming', 'outgoing']].sum()
+            summary = totals.loc[(totals['incoming'] > 0) | (totals['outgoing'] > 0)].reset_index()
 
             ax.bar(summary['timestamp'], summary['incoming'], color='#2ecc71', label='Входящие', width=0.8, edgecolor='#a9dfbf', linewidth=0.6)
-            ax.bar(summary['timestamp'], summary['outgoing'].apply(lambda x: -x), color='#e74c3c', label='Исходящие', width=0.8, edgecolor='#f5b7b1', linewidth=0.6)
+            ax.bar(summary['timestamp'], -summary['outgoing'].to_numpy(), color='#e74c3c', label='Исходящие', width=0.8, edgecolor='#f5b7b1', linewidth=0.6)
             ax.legend(frameon=False, labelcolor='#EAEAEA')
             ax.set_title(f'Объем транзакций ({title_period}) для {address[:6]}...{address[-4:]}', fontsize=16, pad=20)
 
@@ -104,13 +146,10 @@ def create_daily_volume_chart(transactions: list, address: str, token_accounts:
             return f'{abs(y):,.2f}'
         ax.yaxis.set_major_formatter(FuncFormatter(y_axis_formatter))
         
-        plt.tight_layout(pad=1.5)
-
         # --- Сохранение в буфер ---
         buf = BytesIO()
-        plt.savefig(buf, format='png', facecolor=fig.get_facecolor(), edgecolor='none')
+        fig.savefig(buf, format='png', facecolor=fig.get_facecolor(), edgecolor='none')
         buf.seek(0)
-        plt.close(fig)
 
         return buf
     except Exception as e:
@@ -1,32 +1,128 @@
+import asyncio
 import json
+import os
+import threading
+from functools import lru_cache
 from config import DEFAULT_RPC_URL
 
+try:
+    import orjson
+
+    _json_loads = orjson.loads
+    _json_dumps = orjson.dumps
+except ImportError:
+    _json_loads = json.loads
+
+    def _json_dumps(data) -> bytes:
+        return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
 USER_DATA_FILE = "user_data.json"
 
+# Parsed user data, reused for as long as the file on disk is unchanged.
+_user_data_cache = None
+_user_data_stamp = None
+# Bytes of the last successful write, used to skip saves that change nothing.
+_last_payload = None
+# Guards the cached data and stamps shared by loads on the loop and saves in a worker thread.
+_user_data_lock = threading.Lock()
+_save_lock = asyncio.Lock()
+# User data the memoized per-chat lookups were computed from.
+_lookup_source = None
 
-def load_user_data() -> dict:
-    """Loads user data from a JSON file."""
+
+def _file_stamp() -> tuple:
+    """Identifies the current version of the user data file."""
     try:
-        with open(USER_DATA_FILE, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except (FileNotFoundError, json.JSONDecodeError):
-        return {}
+        return USER_DATA_FILE, os.stat(USER_DATA_FILE).st_mtime_ns
+    except FileNotFoundError:
+        return USER_DATA_FILE, None
 
 
-def save_user_data(data: dict):
-    """Saves user data to a JSON file."""
-    with open(USER_DATA_FILE, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=4, ensure_ascii=False)
+def load_user_data() -> dict:
+    """Loads user data from a JSON file, skipping the parse if the file hasn't changed."""
+    global _user_data_cache, _user_data_stamp
+    with _user_data_lock:
+        stamp = _file_stamp()
+        if _user_data_cache is not None and stamp == _user_data_stamp:
+            return _user_data_cache
 
+        try:
+            with open(USER_DATA_FILE, "rb") as f:
+                data = _json_loads(f.read())
+        except (FileNotFoundError, ValueError):  # JSONDecodeError and bad UTF-8 are both ValueErrors
+            data = {}
 
-def resolve_address(chat_id: int, alias_or_address: str) -> str:
-    """Resolves an alias to a Solana address if it exists for the user."""
+        _user_data_cache, _user_data_stamp = data, stamp
+        return data
+
+
+def _write_user_data(payload: bytes):
+    """Atomically replaces the user data file with `payload`."""
+    global _user_data_stamp, _last_payload
+    tmp_path = f"{USER_DATA_FILE}.tmp"
+    # The slow part runs unlocked so loads on the event loop never wait for the fsync; saves are
+    # already serialized by _save_lock, and a load racing the rename just re-reads the new file.
+    with open(tmp_path, "wb") as f:
+        f.write(payload)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, USER_DATA_FILE)
+    stamp = _file_stamp()
+    with _user_data_lock:
+        _user_data_stamp = stamp
+        _last_payload = payload
+
+
+async def save_user_data(data: dict):
+    """Saves user data to a JSON file without blocking the event loop."""
+    global _user_data_cache
+    # Serialize on the loop so later in-place edits by handlers can't leak into this write.
+    payload = _json_dumps(data)
+    async with _save_lock:  # Keep writes in the order they were requested
+        with _user_data_lock:
+            _user_data_cache = data
+            # Nothing to write if the file still holds exactly these bytes
+            unchanged = payload == _last_payload and _file_stamp() == _user_data_stamp
+        _clear_lookup_caches()  # Handlers edit the loaded dict in place before saving
+        if not unchanged:
+            await asyncio.to_thread(_write_user_data, payload)
+
+
+def _clear_lookup_caches():
+    """Drops memoized alias and RPC lookups."""
+    _cached_alias.cache_clear()
+    _cached_rpc_url.cache_clear()
+
+
+def _lookup_data() -> dict:
+    """Returns the current user data, resetting memoized lookups if it was reloaded."""
+    global _lookup_source
     data = load_user_data()
-    user_aliases = data.get(str(chat_id), {}).get("aliases", {})
+    if data is not _lookup_source:
+        _clear_lookup_caches()
+        _lookup_source = data
+    return data
+
+
+@lru_cache(maxsize=2048)
+def _cached_alias(chat_id: int, alias_or_address: str) -> str:
+    user_aliases = _lookup_source.get(str(chat_id), {}).get("aliases", {})
     return user_aliases.get(alias_or_address, alias_or_address)
 
 
+@lru_cache(maxsize=2048)
+def _cached_rpc_url(chat_id: int):
+    return _lookup_source.get(str(chat_id), {}).get("rpc_url")
+
+
+def resolve_address(chat_id: int, alias_or_address: str) -> str:
+    """Resolves an alias to a Solana address if it exists for the user."""
+    _lookup_data()
+    return _cached_alias(chat_id, alias_or_address)
+
+
 def get_rpc_url(chat_id: int) -> str:
     """Gets the custom RPC URL for a chat, or the default if not set."""
-    data = load_user_data()
-    return data.get(str(chat_id), {}).get("rpc_url", DEFAULT_RPC_URL)
+    _lookup_data()
+    rpc_url = _cached_rpc_url(chat_id)
+    return DEFAULT_RPC_URL if rpc_url is None else rpc_url
@@ -1,21 +1,27 @@
 import logging
 import asyncio
+import multiprocessing
 import sys
+from concurrent.futures import ProcessPoolExecutor
 from datetime import time
 
 import pytz
+import ujson
 from telegram import BotCommand
-from telegram.ext import Application, CommandHandler, CallbackQueryHandler, MessageHandler, filters
+from telegram.ext import AIORateLimiter, Application, CommandHandler, CallbackQueryHandler, MessageHandler, filters
+from telegram.request import HTTPXRequest
 
 from config import TELEGRAM_BOT_TOKEN, DEFAULT_RPC_URL
 from data_manager import load_user_data
 from monitoring import MONITOR_TASKS, start_monitoring_task
+from solana_client import close_shared_session
+from solana_helpers import close_birdeye_client
 from bot_commands import (
     start, help_command, scan, chart, balance, price, tokeninfo,
     monitor, unmonitor, list_monitors,
     add_address, remove_address, list_addresses,
     schedule, unschedule, list_schedules,
-    set_rpc, get_rpc, reset_rpc, scheduled_scan_callback,
+    set_rpc, get_rpc, reset_rpc, schedule_scan_job,
     button_callback_handler, text_handler, cancel
 )
 
@@ -35,6 +41,18 @@ else:
         logger.warning("uvloop not available, using default event loop policy")
 
 
+class UjsonHTTPXRequest(HTTPXRequest):
+    """HTTPXRequest that decodes Telegram responses with ujson instead of the stdlib json."""
+
+    @staticmethod
+    def parse_json_payload(payload: bytes) -> dict:
+        try:
+            return ujson.loads(payload)
+        except ValueError:
+            # Let PTB handle undecodable bytes and report invalid responses the usual way
+            return HTTPXRequest.parse_json_payload(payload)
+
+
 # --- Main bot setup ---
 async def set_bot_commands(application: Application):
     """Sets the bot's command list and restores jobs."""
@@ -57,34 +75,33 @@ async def set_bot_commands(application: Application):
     logger.info("Checking for schedules and monitors to restore...")
     all_user_data = load_user_data()
     
-    # Restore schedules
+    # Restore schedules and monitors in a single pass over the saved data
     job_queue = application.job_queue
     for chat_id_str, user_data in all_user_data.items():
         chat_id = int(chat_id_str)
-        schedules = user_data.get("schedules", {})
-        for alias, details in schedules.items():
+        for alias, details in user_data.get("schedules", {}).items():
             try:
                 scan_time = time.fromisoformat(details["time"]).replace(tzinfo=pytz.UTC)
-                address = details["address"]
-                job_name = f"scan_{chat_id}_{alias}"
-                job_queue.run_daily(
-                    scheduled_scan_callback, time=scan_time, chat_id=chat_id, user_id=chat_id, name=job_name,
-                    data={"chat_id": chat_id, "alias": alias, "address": address}
-                )
+                schedule_scan_job(job_queue, application.bot_data, chat_id, alias, details["address"], scan_time)
                 logger.info(f"Restored schedule for '{alias}' for chat {chat_id}")
             except Exception as e:
                 logger.error(f"Failed to restore schedule for '{alias}' (chat {chat_id}): {e}")
 
-    # Restore monitors
-    for chat_id_str, user_data in all_user_data.items():
-        chat_id = int(chat_id_str)
-        monitors = user_data.get("monitors", {})
-        for address in monitors.keys():
+        for address in user_data.get("monitors", {}):
             if (chat_id, address) not in MONITOR_TASKS:
                 task = asyncio.create_task(start_monitoring_task(application, chat_id, address))
                 MONITOR_TASKS[(chat_id, address)] = task
 
 
+async def release_resources(application: Application):
+    """Closes shared network resources and the chart worker pool on shutdown."""
+    await close_shared_session()
+    await close_birdeye_client()
+    chart_pool = application.bot_data.pop("chart_pool", None)
+    if chart_pool is not None:
+        chart_pool.shutdown(wait=False, cancel_futures=True)
+
+
 def main() -> None:
     """Start the bot."""
     if not TELEGRAM_BOT_TOKEN:
@@ -94,11 +111,27 @@ def main() -> None:
         )
         return
 
-    application = Application.builder().token(TELEGRAM_BOT_TOKEN).build()
+    builder = (
+        Application.builder()
+        .token(TELEGRAM_BOT_TOKEN)
+        # Same pool sizes PTB uses by default, only the JSON decoding differs
+        .request(UjsonHTTPXRequest(connection_pool_size=256))
+        .get_updates_request(UjsonHTTPXRequest(connection_pool_size=1))
+    )
+    try:
+        # Space out outgoing calls to stay under Telegram's flood limits instead of hitting 429s.
+        builder.rate_limiter(AIORateLimiter(overall_max_rate=30, overall_time_period=1, max_retries=3))
+    except RuntimeError:
+        logger.warning("aiolimiter not available, Telegram requests will not be rate limited")
+    application = builder.build()
     application.bot_data["default_rpc_url"] = DEFAULT_RPC_URL
+    # Chart rendering is CPU-bound; worker processes keep it from stalling the event loop.
+    # "spawn" avoids forking a process that already runs the event loop and its threads.
+    application.bot_data["chart_pool"] = ProcessPoolExecutor(max_workers=2, mp_context=multiprocessing.get_context("spawn"))
 
     # Set up bot commands for the menu
     application.post_init = set_bot_commands
+    application.post_shutdown = release_resources
 
     # Register handlers
     # --- New UI Handlers ---
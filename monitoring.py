@@ -1,86 +1,111 @@
 import logging
 import asyncio
+from collections import defaultdict
 
 from telegram import helpers
 from telegram.ext import Application
 from telegram.constants import ParseMode
 
-from solana_client import AsyncCustomSolanaClient
+from solana_client import AsyncCustomSolanaClient, get_shared_session
 from data_manager import get_rpc_url
-from solana_helpers import get_token_prices
+from solana_helpers import get_token_symbols
+from config import BIRDEYE_API_KEY
 
 logger = logging.getLogger(__name__)
 
+# Polling and reconnect delays go through this name so tests can swap in a no-op.
+_sleep = asyncio.sleep
+
 MONITOR_TASKS = {}
 
+# Caps how many monitors (re)connect at once, e.g. when all of them are restored on startup.
+_CONNECT_SEMAPHORE = asyncio.Semaphore(16)
+
+# Polling for a just-notified transaction: first retry delay and attempts in total.
+_TX_POLL_DELAY = 0.25
+_TX_POLL_ATTEMPTS = 7
+
+# --- Notification templates, escaped once at import ---
+_RECEIVED = "🟢 Получено"
+_SENT = "🔴 Отправлено"
+_HEADER_TEMPLATE = "🔔 **Новая транзакция** для кошелька `{short}`"
+# Manually create link to avoid issues with different library versions
+_TX_LINK_TEMPLATE = "[" + helpers.escape_markdown("Посмотреть на Solscan", version=2) + "](https://solscan.io/tx/{signature})"
+
+
+def _ui_amount(balance: dict) -> float:
+    """Reads a token balance's UI amount, parsing the string form only when the number is missing."""
+    token_amount = balance.get('uiTokenAmount', {})
+    amount = token_amount.get('uiAmount')
+    if amount is None:
+        amount = float(token_amount.get('uiAmountString') or 0)
+    return amount
+
 
 async def format_transaction_notification(tx_info: dict, wallet_address: str, rpc_url: str) -> str:
     """Formats a transaction into a notification message."""
     signature = tx_info['signature']
-    link = f"https://solscan.io/tx/{signature}"
     tx_result = tx_info.get("transaction", {})
     meta = tx_info.get("meta", {})
     if not tx_result or not meta or meta.get("err"):
         return "" # Don't notify for failed or malformed transactions
 
     sol_change = 0
-    token_changes = []
 
     # Get SOL balance change
     try:
         account_keys = tx_result.get('message', {}).get('accountKeys', [])
-        addr_idx = next((i for i, acc in enumerate(account_keys) if acc == wallet_address), -1)
-        if addr_idx != -1:
-            pre_sol = meta['preBalances'][addr_idx]
-            post_sol = meta['postBalances'][addr_idx]
-            sol_change = (post_sol - pre_sol) / 1_000_000_000
-    except (KeyError, IndexError, TypeError):
+        addr_idx = account_keys.index(wallet_address)  # ValueError if the wallet isn't an account here
+        pre_sol = meta['preBalances'][addr_idx]
+        post_sol = meta['postBalances'][addr_idx]
+        sol_change = (post_sol - pre_sol) / 1_000_000_000
+    except (KeyError, IndexError, TypeError, ValueError):
         pass # Ignore if SOL balances are not available
 
-    # Get SPL token balance changes
-    token_accounts = []
-    try:
-        async with AsyncCustomSolanaClient(rpc_url) as client:
-            res = await client.get_token_accounts_by_owner(wallet_address)
-            if res and res.get("result", {}).get("value"):
-                token_accounts = {acc["pubkey"] for acc in res["result"]["value"]}
-    except Exception as e:
-        logger.error(f"Monitor could not fetch token accounts for {wallet_address}: {e}")
-
-    pre_token_balances = {b['mint']: b for b in meta.get("preTokenBalances", []) if b.get('owner') == wallet_address}
-    post_token_balances = {b['mint']: b for b in meta.get("postTokenBalances", []) if b.get('owner') == wallet_address}
-    all_mints = set(pre_token_balances.keys()) | set(post_token_balances.keys())
-
-    for mint in all_mints:
-        pre_amount = float(pre_token_balances.get(mint, {}).get('uiTokenAmount', {}).get('uiAmountString', '0'))
-        post_amount = float(post_token_balances.get(mint, {}).get('uiTokenAmount', {}).get('uiAmountString', '0'))
-        change = post_amount - pre_amount
-        if abs(change) > 0:
-            token_changes.append({'mint': mint, 'change': change})
+    # Get SPL token balance changes; token balances carry their owner, so no account lookup is needed
+    # One pass per balance list, accumulating post - pre per mint
+    deltas = defaultdict(float)
+    for sign, balances in ((-1, meta.get("preTokenBalances", [])), (1, meta.get("postTokenBalances", []))):
+        for b in balances:
+            if b.get('owner') == wallet_address:
+                deltas[b['mint']] += sign * _ui_amount(b)
+    token_changes = [{'mint': mint, 'change': change} for mint, change in deltas.items() if change]
 
     # Build the message
     lines = []
     if abs(sol_change) > 0:
-        direction = "🟢 Получено" if sol_change > 0 else "🔴 Отправлено"
+        direction = _RECEIVED if sol_change > 0 else _SENT
         lines.append(f"{direction} `{abs(sol_change):.6f}` **SOL**")
 
     if token_changes:
-        prices = await get_token_prices([tc['mint'] for tc in token_changes])
+        # Only names are needed here, which come from the persistent symbol cache, not a price lookup
+        symbols = await get_token_symbols([tc['mint'] for tc in token_changes], BIRDEYE_API_KEY)
         for tc in token_changes:
-            symbol = prices.get(tc['mint'], {}).get('symbol', tc['mint'][:6]+"...")
-            direction = "🟢 Получено" if tc['change'] > 0 else "🔴 Отправлено"
+            symbol = symbols.get(tc['mint'], tc['mint'][:6]+"...")
+            direction = _RECEIVED if tc['change'] > 0 else _SENT
             lines.append(f"{direction} `{abs(tc['change']):,.6f}` **{symbol}**")
             
     if not lines:
         return "" # No relevant changes detected
 
-    header = f"🔔 **Новая транзакция** для кошелька `{wallet_address[:4]}...{wallet_address[-4:]}`"
-    # Manually create link to avoid issues with different library versions
-    escaped_text = helpers.escape_markdown("Посмотреть на Solscan", version=2)
-    tx_link = f"[{escaped_text}]({link})"
+    header = _HEADER_TEMPLATE.format(short=f"{wallet_address[:4]}...{wallet_address[-4:]}")
+    tx_link = _TX_LINK_TEMPLATE.format(signature=signature)
     return f"{header}\n\n" + "\n".join(lines) + f"\n\n{tx_link}"
 
 
+async def _wait_for_transaction(client: AsyncCustomSolanaClient, signature: str):
+    """Polls until the RPC can serve a just-notified transaction at confirmed commitment."""
+    delay = _TX_POLL_DELAY
+    for attempt in range(_TX_POLL_ATTEMPTS):
+        tx_info_res = await client.get_transaction(signature, commitment="confirmed")
+        if tx_info_res and tx_info_res.get('result'):
+            return tx_info_res
+        if attempt < _TX_POLL_ATTEMPTS - 1:
+            await _sleep(delay)
+            delay = min(delay * 2, 2)
+    return None
+
+
 async def start_monitoring_task(application: Application, chat_id: int, address: str):
     """The main loop for monitoring a wallet using websockets."""
     rpc_url = get_rpc_url(chat_id)
@@ -90,19 +115,19 @@ async def start_monitoring_task(application: Application, chat_id: int, address:
     
     while True: # Outer loop for reconnection
         try:
-            async with AsyncCustomSolanaClient(rpc_url) as client:
-                await client.ws_connect(ws_url)
-                await client.logs_subscribe(address)
+            # Each monitor keeps its own client for the websocket state, but on the shared session
+            async with AsyncCustomSolanaClient(rpc_url, session=get_shared_session()) as client:
+                async with _CONNECT_SEMAPHORE:
+                    await client.ws_connect(ws_url)
+                    await client.logs_subscribe(address)
                 
                 while True: # Inner loop for receiving messages
                     message = await client.ws_recv()
                     if message and 'params' in message and 'result' in message['params']:
                         signature = message['params']['result']['value']['signature']
                         
-                        # Use a small delay to ensure transaction is finalized on RPC
-                        await asyncio.sleep(2) 
-                        
-                        tx_info_res = await client.get_transaction(signature, max_supported_transaction_version=0)
+                        # Fetch as soon as the RPC has it instead of sleeping a fixed time first
+                        tx_info_res = await _wait_for_transaction(client, signature)
                         if tx_info_res and tx_info_res.get('result'):
                             notification_msg = await format_transaction_notification(tx_info_res['result'], address, rpc_url)
                             if notification_msg:
@@ -115,7 +140,7 @@ async def start_monitoring_task(application: Application, chat_id: int, address:
             break # Exit the outer loop
         except Exception as e:
             logger.error(f"Error in monitor for {address} (chat {chat_id}): {e}. Reconnecting in 10s...")
-            await asyncio.sleep(10) # Wait before reconnecting
+            await _sleep(10) # Wait before reconnecting
         finally:
             if 'client' in locals() and client.ws_is_connected():
                 await client.ws_close()
@@ -1,13 +1,96 @@
 import aiohttp
 import asyncio
-from typing import Optional, Dict, List, Any
+from contextlib import asynccontextmanager
+from typing import Optional, Dict, List, Any, Tuple
 import logging
 import ujson
 
+from cache_utils import LRUCache, TTLCache
+
+try:
+    import orjson
+
+    # Noticeably faster than ujson on large getTransaction responses
+    _json_loads = orjson.loads
+
+    def _json_dumps(obj) -> str:
+        return orjson.dumps(obj).decode()
+except ImportError:
+    _json_loads = ujson.loads
+    _json_dumps = ujson.dumps
+
 logger = logging.getLogger(__name__)
 
+# Retry backoff goes through this name so tests can swap in a no-op.
+_sleep = asyncio.sleep
+
+# Adaptive request concurrency per client: halved on every 429, doubled back
+# after a run of successful responses.
+_MAX_CONCURRENCY = 50
+_MIN_CONCURRENCY = 4
+_RAMP_UP_AFTER = 20
+
+# Pooled clients live for the whole process and RPC URLs are user-supplied, so both the
+# number of clients and what each one keeps from getTransaction are capped.
+_MAX_CLIENTS = 32
+_TRANSACTION_CACHE_SIZE = 256
+_TRANSACTION_CACHE_TTL = 300
+
+_SHARED_SESSION: Optional[aiohttp.ClientSession] = None
+_CLIENTS = LRUCache(maxsize=_MAX_CLIENTS)
+
+
+def get_shared_session() -> aiohttp.ClientSession:
+    """Returns the process-wide pooled HTTP session, creating it on first use."""
+    global _SHARED_SESSION
+    if _SHARED_SESSION is None or _SHARED_SESSION.closed:
+        # aiohttp only speaks HTTP/1.1, so setup cost is kept down by holding connections
+        # and DNS answers for as long as the RPC hosts allow.
+        connector = aiohttp.TCPConnector(ssl=True, limit=100, limit_per_host=20, keepalive_timeout=300, ttl_dns_cache=300)
+        _SHARED_SESSION = aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=30),
+            trust_env=True,
+            json_serialize=ujson.dumps
+        )
+    return _SHARED_SESSION
+
+
+def get_solana_client(rpc_url: str) -> "AsyncCustomSolanaClient":
+    """Returns a long-lived client for `rpc_url` that runs on the shared session.
+
+    Using it with `async with` is a no-op since the session is borrowed; the
+    client lives until `close_shared_session` is called.
+    """
+    session = get_shared_session()
+    client = _CLIENTS.get(rpc_url)
+    if client is None or client.session is not session:
+        client = AsyncCustomSolanaClient(rpc_url, session=session)
+        _CLIENTS[rpc_url] = client
+    return client
+
+
+def _encode_call(request_id: int, method: str, params_json: str) -> str:
+    """Renders one JSON-RPC call around params that were serialized up front."""
+    return f'{{"jsonrpc":"2.0","id":{request_id},"method":"{method}","params":{params_json}}}'
+
+
+def _transaction_cache_key(params: List[Any]) -> tuple:
+    """Keys a getTransaction call by signature and encoding."""
+    return params[0], params[1].get("encoding") if len(params) > 1 else None
+
+
+async def close_shared_session():
+    """Closes the pooled HTTP session and drops the clients using it. Called once on bot shutdown."""
+    global _SHARED_SESSION
+    _CLIENTS.clear()
+    if _SHARED_SESSION is not None and not _SHARED_SESSION.closed:
+        await _SHARED_SESSION.close()
+    _SHARED_SESSION = None
+
+
 class AsyncCustomSolanaClient:
-    def __init__(self, rpc_url: str):
+    def __init__(self, rpc_url: str, session: Optional[aiohttp.ClientSession] = None):
         if not rpc_url:
             rpc_url = "https://api.mainnet-beta.solana.com"
         self.rpc_url = rpc_url
@@ -15,6 +98,8 @@ class AsyncCustomSolanaClient:
             'Content-Type': 'application/json',
             'Accept': 'application/json',
         }
+        # JSON-RPC batches save a round trip per call; turned off for providers that don't want them.
+        self.supports_batch = True
 
         if 'alchemy' in rpc_url.lower():
             api_key = rpc_url.split('/')[-1]
@@ -26,71 +111,193 @@ class AsyncCustomSolanaClient:
             })
         elif 'quiknode' in rpc_url.lower():
             # QuickNode authenticates via the URL, no special headers needed for standard RPC.
-            pass
+            # It bills every call inside a batch separately, so batching gains nothing there.
+            self.supports_batch = False
 
         self.request_id = 1
-        self.session = None
+        # An externally-managed (pooled) session is borrowed, never closed by the client.
+        self.session = session
+        self._owns_session = session is None
         self.timeout = aiohttp.ClientTimeout(total=30)
-        self.semaphore = asyncio.Semaphore(50)
-        self.transaction_cache = {}
+        self.concurrency_limit = _MAX_CONCURRENCY
+        self._active_requests = 0
+        self._successes = 0
+        self._slots = asyncio.Condition()
+        # Small and short-lived: full jsonParsed responses are large, and scans cache their parsed rows instead.
+        self.transaction_cache = TTLCache(maxsize=_TRANSACTION_CACHE_SIZE, ttl=_TRANSACTION_CACHE_TTL)
+        # getTransaction calls currently on the wire, shared by identical concurrent callers.
+        self._inflight: Dict[tuple, asyncio.Future] = {}
 
     async def __aenter__(self):
-        connector = aiohttp.TCPConnector(ssl=True, limit=100)
-        self.session = aiohttp.ClientSession(
-            connector=connector,
-            headers=self.headers,
-            timeout=self.timeout,
-            trust_env=True,
-            json_serialize=ujson.dumps
-        )
+        if self._owns_session:
+            connector = aiohttp.TCPConnector(ssl=True, limit=100)
+            self.session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=self.timeout,
+                trust_env=True,
+                json_serialize=ujson.dumps
+            )
         return self
 
     async def __aexit__(self, exc_type, exc_val, exc_tb):
-        if self.session:
+        if self._owns_session and self.session:
             await self.session.close()
 
-    async def _make_request(self, method: str, params: List[Any], retry_count: int = 3) -> Dict:
-        async with self.semaphore:
-            cache_key = f"{method}:{ujson.dumps(params)}"
-            if method == "getTransaction" and cache_key in self.transaction_cache:
-                return self.transaction_cache[cache_key]
+    @asynccontextmanager
+    async def _request_slot(self):
+        """Holds one of the `concurrency_limit` request slots for the duration of a call."""
+        async with self._slots:
+            await self._slots.wait_for(lambda: self._active_requests < self.concurrency_limit)
+            self._active_requests += 1
+        try:
+            yield
+        finally:
+            async with self._slots:
+                self._active_requests -= 1
+                # Wake as many waiters as there are free slots, the limit may have grown meanwhile.
+                self._slots.notify(max(self.concurrency_limit - self._active_requests, 0))
+
+    def _on_rate_limited(self):
+        """Backs off the concurrency limit after the provider answered 429."""
+        self._successes = 0
+        new_limit = max(_MIN_CONCURRENCY, self.concurrency_limit // 2)
+        if new_limit < self.concurrency_limit:
+            logger.warning(f"Rate limited by {self.rpc_url}, lowering concurrency to {new_limit}")
+            self.concurrency_limit = new_limit
+
+    def _on_success(self):
+        """Raises the concurrency limit back once the provider keeps up again."""
+        if self.concurrency_limit >= _MAX_CONCURRENCY:
+            return
+        self._successes += 1
+        if self._successes >= _RAMP_UP_AFTER:
+            self._successes = 0
+            self.concurrency_limit = min(_MAX_CONCURRENCY, self.concurrency_limit * 2)
+
+    async def _make_request(self, method: str, params: List[Any], retry_count: int = 3, cache: bool = True) -> Dict:
+        if method != "getTransaction":
+            return await self._send_request(method, params, retry_count)
 
+        # getTransaction goes cache -> identical call already in flight -> network.
+        cache_key = _transaction_cache_key(params)
+        while True:
+            cached = self.transaction_cache.get(cache_key)
+            if cached is not None:
+                return cached
+            inflight = self._inflight.get(cache_key)
+            if inflight is None:
+                break
+            try:
+                # Shielded so a cancelled waiter doesn't cancel the request for everyone else
+                return await asyncio.shield(inflight)
+            except asyncio.CancelledError:
+                if not inflight.cancelled():
+                    raise  # This caller itself was cancelled
+                # The caller that sent the request was cancelled; look again and send it ourselves if needed
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[cache_key] = future
+        try:
+            result = await self._send_request(method, params, retry_count)
+        except asyncio.CancelledError:
+            # Waiters retry on a cancelled future instead of inheriting a cancellation that wasn't theirs
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()  # Retrieved here so it isn't reported when nobody else was waiting
+            raise
+        finally:
+            self._inflight.pop(cache_key, None)
+
+        # A null result means the node doesn't have the transaction yet, so it's not cached.
+        if cache and result.get("result") is not None:
+            self.transaction_cache[cache_key] = result
+        future.set_result(result)
+        return result
+
+    async def _send_request(self, method: str, params: List[Any], retry_count: int) -> Dict:
+        """Posts a single JSON-RPC call, retrying with backoff."""
+        async with self._request_slot():
+            # Params are serialized once; retries only swap in a new id.
+            params_json = _json_dumps(params)
             for attempt in range(retry_count):
-                payload = {
-                    "jsonrpc": "2.0",
-                    "id": self.request_id,
-                    "method": method,
-                    "params": params
-                }
+                payload = _encode_call(self.request_id, method, params_json).encode()
                 self.request_id += 1
 
                 try:
                     async with self.session.post(
                             self.rpc_url,
-                            json=payload,
+                            data=payload,
+                            headers=self.headers,
                             allow_redirects=True,
                             verify_ssl=True
                     ) as response:
                         if response.status == 429:
-                            await asyncio.sleep(2 ** attempt)
+                            self._on_rate_limited()
+                            await _sleep(2 ** attempt)
                             continue
                         elif response.status == 403:
                             raise Exception("Authentication failed. Check your RPC URL and API key.")
 
                         response.raise_for_status()
-                        result = await response.json(loads=ujson.loads)
-
-                        if method == "getTransaction":
-                            self.transaction_cache[cache_key] = result
-
+                        result = await response.json(loads=_json_loads)
+                        self._on_success()
                         return result
                 except Exception as e:
                     if attempt == retry_count - 1:
                         logger.error(f"Request error after {retry_count} attempts: {str(e)}")
                         raise
-                    await asyncio.sleep(2 ** attempt)
+                    await _sleep(2 ** attempt)
             return {"error": "Max retries reached"}
 
+    async def _make_batch_request(self, calls: List[Tuple[str, List[Any]]], retry_count: int = 3) -> List[Dict]:
+        """Sends `(method, params)` calls as one JSON-RPC batch and returns the responses in call order."""
+        async with self._request_slot():
+            encoded_calls = [(method, _json_dumps(params)) for method, params in calls]
+            for attempt in range(retry_count):
+                first_id = self.request_id
+                payload = ("[" + ",".join(
+                    _encode_call(first_id + i, method, params_json)
+                    for i, (method, params_json) in enumerate(encoded_calls)
+                ) + "]").encode()
+                self.request_id += len(calls)
+
+                try:
+                    async with self.session.post(
+                            self.rpc_url,
+                            data=payload,
+                            headers=self.headers,
+                            allow_redirects=True,
+                            verify_ssl=True
+                    ) as response:
+                        if response.status == 429:
+                            self._on_rate_limited()
+                            await _sleep(2 ** attempt)
+                            continue
+                        elif response.status == 403:
+                            raise Exception("Authentication failed. Check your RPC URL and API key.")
+
+                        response.raise_for_status()
+                        results = await response.json(loads=_json_loads)
+                        self._on_success()
+                except Exception as e:
+                    if attempt == retry_count - 1:
+                        logger.error(f"Batch request error after {retry_count} attempts: {str(e)}")
+                        raise
+                    await _sleep(2 ** attempt)
+                    continue
+
+                if not isinstance(results, list):
+                    # The provider rejected the batch as a whole; later calls go one by one.
+                    self.supports_batch = False
+                    raise Exception(f"RPC does not accept batch requests: {results}")
+
+                # Batch responses may come back in any order, match them up by id.
+                by_id = {res.get("id"): res for res in results if isinstance(res, dict)}
+                return [by_id.get(first_id + i, {"error": "Missing batch response"}) for i in range(len(calls))]
+            return [{"error": "Max retries reached"}] * len(calls)
+
     async def get_signatures_for_address(self, address: str, before: Optional[str] = None,
                                          until: Optional[str] = None, limit: int = 1000):
         config = {"limit": limit}
@@ -100,11 +307,30 @@ class AsyncCustomSolanaClient:
             config["until"] = until
         return await self._make_request("getSignaturesForAddress", [address, config])
 
-    async def get_transaction(self, signature: str, encoding: str = "jsonParsed"):
-        return await self._make_request(
-            "getTransaction",
-            [signature, {"encoding": encoding, "maxSupportedTransactionVersion": 0}]
-        )
+    async def get_transaction(self, signature: str, encoding: str = "jsonParsed", commitment: Optional[str] = None,
+                              cache: bool = True):
+        config = {"encoding": encoding, "maxSupportedTransactionVersion": 0}
+        if commitment:
+            config["commitment"] = commitment
+        return await self._make_request("getTransaction", [signature, config], cache=cache)
+
+    async def get_transactions(self, signatures: List[str], encoding: str = "jsonParsed", cache: bool = True) -> List[Dict]:
+        """Fetches several transactions in one batch request, reusing cached ones.
+
+        With `cache=False` the fetched responses are not kept, e.g. for scans that store parsed rows.
+        """
+        params_list = [[sig, {"encoding": encoding, "maxSupportedTransactionVersion": 0}] for sig in signatures]
+        cache_keys = [_transaction_cache_key(params) for params in params_list]
+        responses = [self.transaction_cache.get(key) for key in cache_keys]
+
+        missing = [i for i, res in enumerate(responses) if res is None]
+        if missing:
+            fetched = await self._make_batch_request([("getTransaction", params_list[i]) for i in missing])
+            for i, res in zip(missing, fetched):
+                responses[i] = res
+                if cache and res.get("result") is not None:
+                    self.transaction_cache[cache_keys[i]] = res
+        return responses
 
     async def get_token_accounts_by_owner(self, owner: str, mint: Optional[str] = None):
         filter_param = {"programId": "TokenkegQfeZyiNwAJbNbGKPFXCWuBvf9Ss623VQ5DA"}
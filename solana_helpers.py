@@ -1,15 +1,84 @@
 import logging
 import asyncio
 import csv
+import sqlite3
+from contextlib import closing
 from datetime import datetime
 from io import StringIO, BytesIO
 from typing import List, Dict, Any, Optional, Tuple
 
 import httpx
-from solana_client import AsyncCustomSolanaClient
+from solana_client import AsyncCustomSolanaClient, get_solana_client
+from cache_utils import TTLCache
+
+try:
+    from aiolimiter import AsyncLimiter
+except ImportError:
+    AsyncLimiter = None
 
 logger = logging.getLogger(__name__)
 
+# Retry backoff goes through this name so tests can swap in a no-op.
+_sleep = asyncio.sleep
+
+if AsyncLimiter is None:
+    logger.warning("aiolimiter not available, Birdeye requests will not be rate limited")
+_BIRDEYE_LIMITER = None
+_BIRDEYE_LIMITER_LOOP = None
+# Most tokens Birdeye's multi_price endpoint accepts per request.
+_BIRDEYE_MULTI_PRICE_MAX = 100
+# Token symbols never change, so they are kept on disk and loaded once per process.
+TOKEN_SYMBOLS_DB = "token_symbols.db"
+_SYMBOL_CACHE: Optional[Dict[str, str]] = None
+# Most tokens Birdeye's metadata endpoint accepts per request.
+_BIRDEYE_METADATA_MAX = 50
+# Kept open across price lookups so Birdeye connections are reused.
+_BIRDEYE_CLIENT: Optional[httpx.AsyncClient] = None
+_BIRDEYE_CLIENT_LOOP = None
+
+# Prices move quickly, token metadata (decimals, authorities) rarely changes.
+# Supply changes with every mint and burn, so it is never cached.
+_PRICE_CACHE = TTLCache(maxsize=4096, ttl=300)
+_TOKEN_DETAILS_CACHE = TTLCache(maxsize=4096, ttl=3600)
+_TOKEN_DETAILS_CACHED_FIELDS = ('decimals', 'mint_authority', 'freeze_authority')
+# New transactions per (address, RPC URL, last signature), so scheduled scans of the same
+# wallet due together share one RPC run. Kept small: a single result can hold up to 10k parsed rows.
+_TRANSACTIONS_CACHE = TTLCache(maxsize=32, ttl=60)
+# getTransaction calls per JSON-RPC batch and batches in flight at once.
+_TX_BATCH_SIZE = 50
+_TX_BATCH_CONCURRENCY = 4
+# Birdeye lookups currently in progress, shared by callers asking for the same token.
+_PRICE_INFLIGHT: Dict[str, asyncio.Future] = {}
+
+
+def _get_birdeye_limiter() -> Optional["AsyncLimiter"]:
+    """Returns the Birdeye rate limiter bound to the running event loop."""
+    global _BIRDEYE_LIMITER, _BIRDEYE_LIMITER_LOOP
+    if AsyncLimiter is None:
+        return None
+    loop = asyncio.get_running_loop()
+    if _BIRDEYE_LIMITER_LOOP is not loop:
+        _BIRDEYE_LIMITER, _BIRDEYE_LIMITER_LOOP = AsyncLimiter(25, 1), loop
+    return _BIRDEYE_LIMITER
+
+
+def _get_birdeye_client() -> httpx.AsyncClient:
+    """Returns the pooled Birdeye HTTP client bound to the running event loop."""
+    global _BIRDEYE_CLIENT, _BIRDEYE_CLIENT_LOOP
+    loop = asyncio.get_running_loop()
+    if _BIRDEYE_CLIENT is None or _BIRDEYE_CLIENT.is_closed or _BIRDEYE_CLIENT_LOOP is not loop:
+        _BIRDEYE_CLIENT = httpx.AsyncClient(timeout=10, limits=httpx.Limits(max_keepalive_connections=20))
+        _BIRDEYE_CLIENT_LOOP = loop
+    return _BIRDEYE_CLIENT
+
+
+async def close_birdeye_client():
+    """Closes the pooled Birdeye client. Called once on bot shutdown."""
+    global _BIRDEYE_CLIENT, _BIRDEYE_CLIENT_LOOP
+    if _BIRDEYE_CLIENT is not None and not _BIRDEYE_CLIENT.is_closed:
+        await _BIRDEYE_CLIENT.aclose()
+    _BIRDEYE_CLIENT = _BIRDEYE_CLIENT_LOOP = None
+
 
 # --- Core Solana scanning logic ---
 async def _fetch_transaction_with_retry(client: AsyncCustomSolanaClient, sig_info: dict, sem: asyncio.Semaphore):
@@ -22,18 +91,74 @@ async def _fetch_transaction_with_retry(client: AsyncCustomSolanaClient, sig_inf
     for attempt in range(MAX_RETRIES):
         try:
             async with sem:
-                return await client.get_transaction(signature)
+                # Scans cache their parsed rows, keeping the raw responses would only duplicate them
+                return await client.get_transaction(signature, cache=False)
         except Exception as e:
             logger.warning(f"Attempt {attempt + 1}/{MAX_RETRIES} failed for tx {signature}: {e}. Retrying in {delay}s...")
 
         if attempt < MAX_RETRIES - 1:
-            await asyncio.sleep(delay)
+            await _sleep(delay)
             delay *= 2  # Exponential backoff
 
     logger.error(f"Failed to fetch transaction {signature} after {MAX_RETRIES} attempts.")
     return None
 
 
+async def _fetch_transactions(client: AsyncCustomSolanaClient, signatures: List[dict]) -> List[Optional[dict]]:
+    """Fetches the transactions for `signatures`, in JSON-RPC batches when the provider allows it."""
+    # Use a semaphore to limit concurrent requests and a retry mechanism to handle RPC errors.
+    sem = asyncio.Semaphore(15)  # Reduced concurrency to avoid rate limiting
+    if not client.supports_batch:
+        return await asyncio.gather(*(_fetch_transaction_with_retry(client, sig, sem) for sig in signatures))
+
+    batch_sem = asyncio.Semaphore(_TX_BATCH_CONCURRENCY)
+
+    async def fetch_chunk(chunk: List[dict]) -> List[Optional[dict]]:
+        try:
+            async with batch_sem:
+                return await client.get_transactions([sig['signature'] for sig in chunk], cache=False)
+        except Exception as e:
+            logger.warning(f"Batch of {len(chunk)} transactions failed: {e}. Fetching them one by one...")
+            return await asyncio.gather(*(_fetch_transaction_with_retry(client, sig, sem) for sig in chunk))
+
+    chunks = [signatures[i:i + _TX_BATCH_SIZE] for i in range(0, len(signatures), _TX_BATCH_SIZE)]
+    responses = []
+    for chunk_responses in await asyncio.gather(*(fetch_chunk(chunk) for chunk in chunks)):
+        responses.extend(chunk_responses)
+    return responses
+
+
+async def _iter_signature_pages(client: AsyncCustomSolanaClient, address: str, select_page, max_signatures: int):
+    """Yields the signatures `select_page` picks from each page of history, newest first.
+
+    `select_page(batch)` returns the signatures to keep and whether to stop paging.
+    The next page is requested before the current one is yielded, so its round trip
+    overlaps with whatever the caller does with the current page.
+    """
+    fetched_count = 0
+    next_page = asyncio.ensure_future(client.get_signatures_for_address(address, limit=1000))
+    try:
+        while next_page is not None:
+            response = await next_page
+            next_page = None
+            if "error" in response or not response.get("result"):
+                return
+
+            batch = response["result"]
+            fetched_count += len(batch)
+            selected, stop = select_page(batch)
+            # Stop at the end of the address history or once the safety limit is reached
+            if not stop and len(batch) == 1000 and fetched_count < max_signatures:
+                next_page = asyncio.ensure_future(
+                    client.get_signatures_for_address(address, limit=1000, before=batch[-1]["signature"])
+                )
+            if selected:
+                yield selected
+    finally:
+        if next_page is not None:
+            next_page.cancel()
+
+
 def _parse_transaction_details(tx_response: Dict[str, Any], sig_info: Dict[str, Any]) -> List[Dict[str, Any]]:
     """Parses the details of a transaction response."""
     parsed_data = []
@@ -101,154 +226,128 @@ def _parse_transaction_details(tx_response: Dict[str, Any], sig_info: Dict[str,
     return parsed_data
 
 
+def _parse_transactions(signatures: List[Dict[str, Any]], tx_responses: List[Optional[dict]]) -> List[Dict[str, Any]]:
+    """Parses fetched transactions in signature order."""
+    parsed_data = []
+    for sig_info, tx_response in zip(signatures, tx_responses):
+        parsed_data.extend(_parse_transaction_details(tx_response, sig_info))
+    return parsed_data
+
+
 async def fetch_and_parse_transactions(address: str, rpc_url: str, limit: int = 100, start_block: Optional[int] = None, end_block: Optional[int] = None, start_date: Optional[datetime] = None, end_date: Optional[datetime] = None) -> List[Dict[str, Any]]:
     """Fetches and parses transactions for a given Solana address based on different criteria."""
     parsed_data = []
     try:
-        async with AsyncCustomSolanaClient(rpc_url) as client:
+        async with get_solana_client(rpc_url) as client:
             logger.info(f"Fetching signatures for address {address}...")
 
-            signatures = []
-            if start_date and end_date:
-                start_ts = int(start_date.timestamp())
-                end_ts = int(end_date.timestamp())
-                
-                before_sig = None
-                fetched_count = 0
-                while fetched_count < 20000:  # Safety limit of 20000 txns to avoid extreme usage
-                    response = await client.get_signatures_for_address(address, limit=1000, before=before_sig)
-                    if "error" in response or not response.get("result"):
-                        break
-                    
-                    batch = response["result"]
-                    if not batch:
-                        break
-
-                    # Collect signatures within the date range
-                    for sig_info in batch:
-                        block_time = sig_info.get("blockTime")
-                        if block_time and start_ts <= block_time <= end_ts:
-                            signatures.append(sig_info)
-                    
-                    # If the last signature in the batch is older than our start date, we can stop.
-                    last_sig_time = batch[-1].get("blockTime")
-                    if last_sig_time and last_sig_time < start_ts:
-                        break
-
-                    # Stop if we've reached the end of the history for this address
-                    if len(batch) < 1000:
-                        break
-                    
-                    before_sig = batch[-1]["signature"]
-                    fetched_count += len(batch)
-
-            elif start_block or end_block:
-                before_sig = None
-                fetched_count = 0
-                while fetched_count < 5000:  # Safety limit of 5000 txns to avoid extreme usage
-                    response = await client.get_signatures_for_address(address, limit=1000, before=before_sig)
-                    if "error" in response or not response.get("result"):
-                        break
-                    
-                    batch = response["result"]
-                    if not batch:
-                        break
-
-                    stop_fetching = False
-                    for sig_info in batch:
-                        slot = sig_info.get("slot")
-                        if end_block and slot > end_block:
-                            continue
-                        if start_block and slot < start_block:
-                            stop_fetching = True
-                            break
-                        signatures.append(sig_info)
-                    
-                    if stop_fetching or len(batch) < 1000:
-                        break
-                    
-                    before_sig = batch[-1]["signature"]
-                    fetched_count += len(batch)
+            if (start_date and end_date) or start_block or end_block:
+                if start_date and end_date:
+                    start_ts = int(start_date.timestamp())
+                    end_ts = int(end_date.timestamp())
+                    max_signatures = 20000  # Safety limit to avoid extreme usage
+
+                    def select_page(batch):
+                        # Collect signatures within the date range
+                        selected = [sig_info for sig_info in batch
+                                    if sig_info.get("blockTime") and start_ts <= sig_info["blockTime"] <= end_ts]
+                        # If the last signature in the batch is older than our start date, we can stop.
+                        last_sig_time = batch[-1].get("blockTime")
+                        return selected, bool(last_sig_time and last_sig_time < start_ts)
+                else:
+                    max_signatures = 5000  # Safety limit to avoid extreme usage
+
+                    def select_page(batch):
+                        selected = []
+                        for sig_info in batch:
+                            slot = sig_info.get("slot")
+                            if end_block and slot > end_block:
+                                continue
+                            if start_block and slot < start_block:
+                                return selected, True
+                            selected.append(sig_info)
+                        return selected, False
+
+                pages = _iter_signature_pages(client, address, select_page, max_signatures)
+                try:
+                    async for page in pages:
+                        # The next page of signatures loads while this page's transactions are
+                        # fetched and parsed; parsing runs in a thread to keep the loop free.
+                        tx_responses = await _fetch_transactions(client, page)
+                        parsed_data.extend(await asyncio.to_thread(_parse_transactions, page, tx_responses))
+                finally:
+                    await pages.aclose()
             else:
                 signatures_response = await client.get_signatures_for_address(address, limit=limit)
                 if "error" in signatures_response or not signatures_response.get("result"):
                     logger.error(f"Could not fetch signatures: {signatures_response.get('error')}")
                     return []
                 signatures = signatures_response["result"]
-            
-            logger.info(f"Found {len(signatures)} signatures. Fetching transactions...")
-
-            # Use a semaphore to limit concurrent requests and a retry mechanism to handle RPC errors.
-            sem = asyncio.Semaphore(15)  # Reduced concurrency to avoid rate limiting
-            tx_tasks = [_fetch_transaction_with_retry(client, sig, sem) for sig in signatures]
-            tx_responses = await asyncio.gather(*tx_tasks)
-
-            for sig_info, tx_response in zip(signatures, tx_responses):
-                parsed_data.extend(_parse_transaction_details(tx_response, sig_info))
+                logger.info(f"Found {len(signatures)} signatures. Fetching transactions...")
+                tx_responses = await _fetch_transactions(client, signatures)
+                parsed_data = await asyncio.to_thread(_parse_transactions, signatures, tx_responses)
     except Exception as e:
+        # A partial history would pass for a complete one, so report nothing
         logger.error(f"An error occurred during transaction fetching: {e}")
+        return []
 
     return parsed_data
 
 
-async def fetch_and_parse_new_transactions(address: str, rpc_url: str, last_signature: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
-    """Fetches transactions since the last known signature."""
-    new_signatures_info = []
-    try:
-        async with AsyncCustomSolanaClient(rpc_url) as client:
-            before_sig = None
-            found_last_sig = False
-            newest_signature = None
-
-            # Fetch signatures page by page until we find the last known one
-            for _ in range(10): # Limit to 10 pages (10000 txs) to avoid abuse
-                response = await client.get_signatures_for_address(address, limit=1000, before=before_sig)
-                if "error" in response or not response.get("result"):
-                    break
-                
-                batch = response["result"]
-                if not batch:
-                    break
+async def fetch_and_parse_new_transactions(address: str, rpc_url: str, last_signature: Optional[str] = None, use_cache: bool = False) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """Fetches transactions since the last known signature.
 
-                if not newest_signature:
-                    newest_signature = batch[0]["signature"]
+    With `use_cache`, a result fetched for the same query within the last minute is reused.
+    """
+    cache_key = (address, rpc_url, last_signature)
+    if use_cache:
+        cached = _TRANSACTIONS_CACHE.get(cache_key)
+        if cached is not None:
+            parsed_data, newest_signature = cached
+            return list(parsed_data), newest_signature
 
-                for sig_info in batch:
+    new_signatures_info = []
+    try:
+        async with get_solana_client(rpc_url) as client:
+            def select_page(batch):
+                # Take signatures up to the last known one
+                for i, sig_info in enumerate(batch):
                     if sig_info["signature"] == last_signature:
-                        found_last_sig = True
-                        break
-                    new_signatures_info.append(sig_info)
-                
-                if found_last_sig or len(batch) < 1000:
-                    break
-                
-                before_sig = batch[-1]["signature"]
-
-            if not new_signatures_info:
-                return [], last_signature
+                        return batch[:i], True
+                return batch, False
 
-            # Now fetch and parse the new transactions
             parsed_data = []
-            # Use a semaphore to limit concurrent requests and a retry mechanism to handle RPC errors.
-            sem = asyncio.Semaphore(15)  # Reduced concurrency to avoid rate limiting
-            tx_tasks = [_fetch_transaction_with_retry(client, sig, sem) for sig in new_signatures_info]
-            tx_responses = await asyncio.gather(*tx_tasks)
-
-            for sig_info, tx_response in zip(new_signatures_info, tx_responses):
-                parsed_data.extend(_parse_transaction_details(tx_response, sig_info))
+            # Limit to 10 pages (10000 txs) to avoid abuse
+            pages = _iter_signature_pages(client, address, select_page, max_signatures=10000)
+            try:
+                async for page in pages:
+                    new_signatures_info.extend(page)
+                    tx_responses = await _fetch_transactions(client, page)
+                    parsed_data.extend(await asyncio.to_thread(_parse_transactions, page, tx_responses))
+            finally:
+                await pages.aclose()
 
-            return parsed_data, newest_signature
+            if not new_signatures_info:
+                return [], last_signature
+            newest_signature = new_signatures_info[0]["signature"]
 
     except Exception as e:
         logger.error(f"Error during new transaction fetch for {address}: {e}")
         return [], last_signature
 
+    if use_cache:
+        _TRANSACTIONS_CACHE[cache_key] = (parsed_data, newest_signature)
+    return list(parsed_data), newest_signature
+
 
 async def get_token_details(address: str, rpc_url: str) -> Dict[str, Any]:
     """Fetches details for a given SPL token."""
+    cache_key = (rpc_url, address)
+    cached = _TOKEN_DETAILS_CACHE.get(cache_key)
+
     details = {}
     try:
-        async with AsyncCustomSolanaClient(rpc_url) as client:
+        async with get_solana_client(rpc_url) as client:
             # Get supply and decimals
             supply_res = await client.get_token_supply(address)
             if supply_res and supply_res.get("result"):
@@ -256,25 +355,31 @@ async def get_token_details(address: str, rpc_url: str) -> Dict[str, Any]:
                 details["supply"] = supply_value.get("uiAmountString", supply_value.get("amount"))
                 details["decimals"] = supply_value.get("decimals")
 
-            # Get mint authority info from account data
-            info_res = await client.get_account_info(address)
-            if info_res and info_res.get("result") and info_res["result"].get("value"):
-                parsed_data = info_res["result"]["value"].get("data", {}).get("parsed", {})
-                if parsed_data and parsed_data.get("type") == "mint":
-                    parsed_info = parsed_data.get("info", {})
-                    details["mint_authority"] = parsed_info.get("mintAuthority")
-                    if parsed_info.get("freezeAuthority"):
-                        details["freeze_authority"] = parsed_info.get("freezeAuthority")
+            if cached is None:
+                # Get mint authority info from account data
+                info_res = await client.get_account_info(address)
+                if info_res and info_res.get("result") and info_res["result"].get("value"):
+                    parsed_data = info_res["result"]["value"].get("data", {}).get("parsed", {})
+                    if parsed_data and parsed_data.get("type") == "mint":
+                        parsed_info = parsed_data.get("info", {})
+                        details["mint_authority"] = parsed_info.get("mintAuthority")
+                        if parsed_info.get("freezeAuthority"):
+                            details["freeze_authority"] = parsed_info.get("freezeAuthority")
 
     except Exception as e:
         logger.error(f"Could not fetch token details for {address}: {e}")
+
+    if cached is not None:
+        details.update(cached)
+    elif details:
+        _TOKEN_DETAILS_CACHE[cache_key] = {field: details[field] for field in _TOKEN_DETAILS_CACHED_FIELDS if field in details}
     return details
 
 
 async def get_wallet_balance(address: str, rpc_url: str, api_key: str) -> str:
     """Fetches and formats the wallet balance (SOL and SPL tokens)."""
     try:
-        async with AsyncCustomSolanaClient(rpc_url) as client:
+        async with get_solana_client(rpc_url) as client:
             # Get SOL balance
             sol_balance_res = await client.get_account_info(address)
             sol_balance = 0
@@ -338,7 +443,7 @@ async def get_wallet_balance(address: str, rpc_url: str, api_key: str) -> str:
 
 # --- Price & Monitoring Helpers ---
 async def get_token_prices(token_addresses: List[str], api_key: str) -> Dict[str, Dict[str, Any]]:
-    """Fetches token prices from Birdeye API by making concurrent requests for each token."""
+    """Fetches token prices from Birdeye API, up to 100 tokens per multi_price request."""
     if not token_addresses:
         return {}
     
@@ -361,6 +466,8 @@ async def get_token_prices(token_addresses: List[str], api_key: str) -> Dict[str
         async with sem:
             for attempt in range(MAX_RETRIES):
                 try:
+                    if limiter:
+                        await limiter.acquire()
                     response = await client.get(url, params=params, headers=headers, timeout=10)
                     response.raise_for_status()
                     data = response.json()
@@ -380,24 +487,175 @@ async def get_token_prices(token_addresses: List[str], api_key: str) -> Dict[str
                     logger.warning(f"Price fetch attempt {attempt + 1}/{MAX_RETRIES} for {address} failed with unexpected error: {e}")
 
                 if attempt < MAX_RETRIES - 1:
-                    await asyncio.sleep(delay)
+                    await _sleep(delay)
                     delay *= 2
         
         logger.error(f"Failed to fetch price for {address} after all retries.")
         return address, None
 
+    async def _fetch_price_chunk(client: httpx.AsyncClient, addresses: List[str], sem: asyncio.Semaphore):
+        """Fetches several prices with one multi_price call, falling back to per-token calls."""
+        if len(addresses) == 1:
+            return [await _fetch_one_price(client, addresses[0], sem)]
+
+        url = "https://public-api.birdeye.so/defi/multi_price"
+        params = {
+            "list_address": ",".join(addresses),
+            "check_liquidity": "1",
+            "include_liquidity": "false",
+        }
+        headers = {"X-API-KEY": api_key}
+        MAX_RETRIES = 3
+        delay = 1.0
+
+        async with sem:
+            for attempt in range(MAX_RETRIES):
+                try:
+                    if limiter:
+                        await limiter.acquire()
+                    response = await client.get(url, params=params, headers=headers, timeout=10)
+                    response.raise_for_status()
+                    data = response.json()
+                    if data.get("success") and isinstance(data.get("data"), dict):
+                        prices = data["data"]
+                        results = []
+                        for address in addresses:
+                            price_value = (prices.get(address) or {}).get("value")
+                            results.append((address, {"value": price_value} if price_value is not None else None))
+                        return results
+                    break  # Unexpected payload, fetch one by one instead
+                except httpx.HTTPStatusError as e:
+                    # Client errors, e.g. a plan without bulk access, won't go away on retry
+                    if 400 <= e.response.status_code < 500 and e.response.status_code != 429:
+                        break
+                    logger.warning(f"Bulk price fetch attempt {attempt + 1}/{MAX_RETRIES} failed: {e}")
+                except Exception as e:
+                    logger.warning(f"Bulk price fetch attempt {attempt + 1}/{MAX_RETRIES} failed with unexpected error: {e}")
+
+                if attempt < MAX_RETRIES - 1:
+                    await _sleep(delay)
+                    delay *= 2
+
+        logger.warning(f"Bulk price fetch failed for {len(addresses)} tokens, fetching them one by one.")
+        return await asyncio.gather(*(_fetch_one_price(client, address, sem) for address in addresses))
+
     formatted_prices = {}
+    limiter = _get_birdeye_limiter()
     sem = asyncio.Semaphore(10)  # Limit concurrency to 10 requests at a time
     
-    # Use set to avoid duplicate requests for the same token address
-    unique_addresses = list(set(token_addresses))
-    
-    async with httpx.AsyncClient() as client:
-        tasks = [_fetch_one_price(client, addr, sem) for addr in unique_addresses]
-        results = await asyncio.gather(*tasks)
+    # Use set to avoid duplicate requests for the same token address,
+    # and only hit Birdeye for the ones we don't have a fresh price for.
+    missing_addresses = []
+    for address in set(token_addresses):
+        price_info = _PRICE_CACHE.get(address)
+        if price_info is not None:
+            formatted_prices[address] = price_info
+        else:
+            missing_addresses.append(address)
 
-    for address, price_info in results:
+    if not missing_addresses:
+        return formatted_prices
+
+    # Piggyback on lookups another caller already started; fetch the rest ourselves.
+    shared = {addr: _PRICE_INFLIGHT[addr] for addr in missing_addresses if addr in _PRICE_INFLIGHT}
+    own_addresses = [addr for addr in missing_addresses if addr not in shared]
+    loop = asyncio.get_running_loop()
+    own_futures = {addr: loop.create_future() for addr in own_addresses}
+    _PRICE_INFLIGHT.update(own_futures)
+
+    try:
+        if own_addresses:
+            client = _get_birdeye_client()
+            chunks = [own_addresses[i:i + _BIRDEYE_MULTI_PRICE_MAX] for i in range(0, len(own_addresses), _BIRDEYE_MULTI_PRICE_MAX)]
+            results = []
+            for chunk_results in await asyncio.gather(*(_fetch_price_chunk(client, chunk, sem) for chunk in chunks)):
+                results.extend(chunk_results)
+
+            for address, price_info in results:
+                if price_info:
+                    _PRICE_CACHE[address] = price_info
+                    formatted_prices[address] = price_info
+                if not own_futures[address].done():
+                    own_futures[address].set_result(price_info)
+    finally:
+        for address, future in own_futures.items():
+            if not future.done():
+                future.set_result(None)
+            _PRICE_INFLIGHT.pop(address, None)
+
+    for address, future in shared.items():
+        # Shielded so a cancelled joiner doesn't cancel the lookup for its owner and other joiners
+        price_info = await asyncio.shield(future)
         if price_info:
             formatted_prices[address] = price_info
 
     return formatted_prices
+
+
+def _load_token_symbols() -> Dict[str, str]:
+    """Reads all known token symbols from the on-disk cache."""
+    with closing(sqlite3.connect(TOKEN_SYMBOLS_DB)) as conn:
+        conn.execute("CREATE TABLE IF NOT EXISTS token_symbols (mint TEXT PRIMARY KEY, symbol TEXT NOT NULL)")
+        return dict(conn.execute("SELECT mint, symbol FROM token_symbols"))
+
+
+def _store_token_symbols(symbols: Dict[str, str]):
+    """Adds newly resolved token symbols to the on-disk cache."""
+    with closing(sqlite3.connect(TOKEN_SYMBOLS_DB)) as conn, conn:
+        conn.execute("CREATE TABLE IF NOT EXISTS token_symbols (mint TEXT PRIMARY KEY, symbol TEXT NOT NULL)")
+        conn.executemany("INSERT OR REPLACE INTO token_symbols (mint, symbol) VALUES (?, ?)", symbols.items())
+
+
+async def _fetch_token_symbols(mints: List[str], api_key: str) -> Dict[str, str]:
+    """Looks up token symbols on Birdeye, up to 50 tokens per metadata request."""
+    url = "https://public-api.birdeye.so/defi/v3/token/meta-data/multiple"
+    headers = {"X-API-KEY": api_key}
+    client = _get_birdeye_client()
+    limiter = _get_birdeye_limiter()
+
+    async def fetch_chunk(chunk: List[str]) -> Dict[str, str]:
+        try:
+            if limiter:
+                await limiter.acquire()
+            response = await client.get(url, params={"list_address": ",".join(chunk)}, headers=headers, timeout=10)
+            response.raise_for_status()
+            data = response.json()
+        except Exception as e:
+            logger.warning(f"Symbol lookup for {len(chunk)} tokens failed: {e}")
+            return {}
+        if not data.get("success") or not isinstance(data.get("data"), dict):
+            return {}
+        return {mint: meta["symbol"] for mint, meta in data["data"].items() if meta and meta.get("symbol")}
+
+    symbols = {}
+    chunks = [mints[i:i + _BIRDEYE_METADATA_MAX] for i in range(0, len(mints), _BIRDEYE_METADATA_MAX)]
+    for chunk_symbols in await asyncio.gather(*(fetch_chunk(chunk) for chunk in chunks)):
+        symbols.update(chunk_symbols)
+    return symbols
+
+
+async def get_token_symbols(token_addresses: List[str], api_key: str) -> Dict[str, str]:
+    """Resolves token symbols from the on-disk cache, asking Birdeye only for unseen tokens."""
+    global _SYMBOL_CACHE
+    if _SYMBOL_CACHE is None:
+        try:
+            _SYMBOL_CACHE = await asyncio.to_thread(_load_token_symbols)
+        except sqlite3.Error as e:
+            logger.error(f"Could not read the token symbol cache: {e}")
+            _SYMBOL_CACHE = {}
+
+    unique_addresses = set(token_addresses)
+    symbols = {addr: _SYMBOL_CACHE[addr] for addr in unique_addresses if addr in _SYMBOL_CACHE}
+    missing = [addr for addr in unique_addresses if addr not in symbols]
+    if not missing or not api_key or api_key == "YOUR_API_KEY_HERE":
+        return symbols
+
+    fetched = await _fetch_token_symbols(missing, api_key)
+    if fetched:
+        _SYMBOL_CACHE.update(fetched)
+        symbols.update(fetched)
+        try:
+            await asyncio.to_thread(_store_token_symbols, fetched)
+        except sqlite3.Error as e:
+            logger.error(f"Could not persist token symbols: {e}")
+    return symbols
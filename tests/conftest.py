@@ -0,0 +1,66 @@
+import io
+import os
+import tempfile
+
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+# Keep matplotlib's font cache in one place for the whole run (and across runs),
+# set before any test module imports matplotlib.
+os.environ.setdefault("MPLCONFIGDIR", os.path.join(tempfile.gettempdir(), "solana-tracker-bot-mpl"))
+
+
+def _areturn(value):
+    async def _stub(*args, **kwargs):
+        return value
+    return _stub
+
+
+@pytest.fixture(scope="session")
+def areturn():
+    """Provides `areturn(value)`, a plain coroutine function resolving to `value`.
+
+    Cheaper than AsyncMock for stubs whose calls are never asserted.
+    """
+    return _areturn
+
+
+@pytest.fixture(scope="session")
+def _warm_matplotlib():
+    """Initializes the Agg backend and font cache once, on the first chart test that asks for it."""
+    import matplotlib
+    matplotlib.use("Agg", force=True)
+    import matplotlib.pyplot as plt
+
+    fig = plt.figure()
+    plt.plot([0, 1], [0, 1])
+    fig.savefig(io.BytesIO(), format="png")
+    plt.close(fig)
+
+
+@pytest.fixture(scope="session", autouse=True)
+def _no_retry_sleep():
+    """Makes retry backoff in the RPC and Birdeye helpers, and monitor polling, return immediately."""
+    sleeper = AsyncMock()
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr("solana_client._sleep", sleeper)
+        mp.setattr("solana_helpers._sleep", sleeper)
+        mp.setattr("monitoring._sleep", sleeper)
+        yield sleeper
+
+
+@pytest.fixture
+def async_solana_client(mocker):
+    """Patches a Solana client factory used as `async with factory(rpc_url) as client` and returns the client.
+
+    Keyword arguments become awaitable (untracked) client methods returning the given values.
+    """
+    def _make(target: str, **methods):
+        client = AsyncMock()
+        for name, value in methods.items():
+            setattr(client, name, _areturn(value))
+        factory = MagicMock()
+        factory.return_value.__aenter__.return_value = client
+        mocker.patch(target, factory)
+        return client
+    return _make
@@ -1,86 +1,176 @@
 import pytest
+from datetime import datetime, timezone
+from types import SimpleNamespace
 from unittest.mock import AsyncMock, MagicMock
 import bot_commands
-from bot_commands import add_address, list_addresses, text_handler, _execute_balance, cancel
+from bot_commands import add_address, list_addresses, text_handler, _execute_balance, _execute_scan, _execute_chart, cancel, monitor, schedule, unschedule, _compute_chart_stats, _parse_utc_date, _END_OF_DAY_OFFSET, send_long_message, _parse_scan_args
+
+
+def _reset_bot_mocks(mocks: SimpleNamespace):
+    """Clears recorded calls and restores each mock's default behaviour."""
+    for mock in vars(mocks).values():
+        mock.reset_mock(return_value=True, side_effect=True)
+    mocks.load.return_value = {}
+    mocks.resolve.return_value = "resolved_address"
+    mocks.rpc.return_value = "fake_rpc"
+
+
+@pytest.fixture(scope="module", autouse=True)
+def bot_mocks(module_mocker):
+    """Patches the handlers' storage, lookup and messaging dependencies once for the whole module."""
+    mocks = SimpleNamespace(
+        load=module_mocker.patch('bot_commands.load_user_data'),
+        save=module_mocker.patch('bot_commands.save_user_data', new_callable=AsyncMock),
+        send_long=module_mocker.patch('bot_commands.send_long_message', new_callable=AsyncMock),
+        resolve=module_mocker.patch('bot_commands.resolve_address'),
+        rpc=module_mocker.patch('bot_commands.get_rpc_url'),
+        execute_balance=module_mocker.patch('bot_commands._execute_balance', new_callable=AsyncMock),
+        execute_scan=module_mocker.patch('bot_commands._execute_scan', new_callable=AsyncMock),
+        main_menu=module_mocker.patch('bot_commands.main_menu', new_callable=AsyncMock),
+    )
+    _reset_bot_mocks(mocks)
+    return mocks
+
+
+@pytest.fixture(autouse=True)
+def reset_bot_mocks(bot_mocks):
+    """Gives every test freshly reset module-level mocks."""
+    _reset_bot_mocks(bot_mocks)
+
+
+# Mock telegram Update and Context objects, built once per module and reset for each test
+@pytest.fixture(scope="module")
+def _update_template():
+    update = MagicMock()
+    update.message = AsyncMock()
+    update.callback_query = AsyncMock()
+    return update
+
+
+@pytest.fixture(scope="module")
+def _context_template():
+    context = MagicMock()
+    context.bot = AsyncMock()
+    context.application = MagicMock()
+    return context
 
 
-# Mock telegram Update and Context objects
 @pytest.fixture
-def mock_update():
+def mock_update(_update_template):
     """Provides a mocked Telegram Update object."""
-    update = MagicMock()
+    update = _update_template
+    update.reset_mock(return_value=True, side_effect=True)
     update.effective_chat.id = 12345
-    update.message = AsyncMock()
     update.message.text = "test message"
     update.message.chat_id = 12345
-    update.callback_query = AsyncMock()
     return update
 
 
 @pytest.fixture
-def mock_context():
+def mock_context(_context_template):
     """Provides a mocked Telegram CallbackContext object."""
-    context = MagicMock()
-    context.bot = AsyncMock()
+    context = _context_template
+    context.reset_mock(return_value=True, side_effect=True)
+    context.args = []
     context.user_data = {}
-    context.application = MagicMock()
+    context.bot_data = {}
     return context
 
 
-@pytest.mark.asyncio
-async def test_add_address(mock_update, mock_context, mocker):
+async def test_add_address(mock_update, mock_context, bot_mocks):
     """Tests the /add command."""
-    mock_load = mocker.patch('bot_commands.load_user_data', return_value={})
-    mock_save = mocker.patch('bot_commands.save_user_data')
-
     mock_context.args = ["wsol", "sol_address"]
 
     await add_address(mock_update, mock_context)
 
-    mock_load.assert_called_once()
-    mock_save.assert_called_once_with({'12345': {'aliases': {'wsol': 'sol_address'}}})
+    bot_mocks.load.assert_called_once()
+    bot_mocks.save.assert_called_once_with({'12345': {'aliases': {'wsol': 'sol_address'}}})
     mock_update.message.reply_text.assert_called_once()
     assert "saved" in mock_update.message.reply_text.call_args[0][0]
 
 
-@pytest.mark.asyncio
-async def test_list_addresses_empty(mock_update, mock_context, mocker):
-    """Tests /list command when no addresses are saved."""
-    mocker.patch('bot_commands.load_user_data', return_value={})
-    mock_send_long = mocker.patch('bot_commands.send_long_message', new_callable=AsyncMock)
+@pytest.mark.parametrize("data, expected", [
+    ({}, "You have no saved addresses"),
+    ({"12345": {"aliases": {"wsol": "sol_address"}}}, "▪️ `wsol`: `sol_address`"),
+], ids=["empty", "saved"])
+async def test_list_addresses(mock_update, mock_context, bot_mocks, data, expected):
+    """Tests the /list command with and without saved addresses."""
+    bot_mocks.load.return_value = data
 
     await list_addresses(mock_update, mock_context)
 
     # Instead of checking bot.send_message, we check our helper
-    mock_send_long.assert_awaited_once()
-    sent_text = mock_send_long.call_args.args[2]
-    assert "You have no saved addresses" in sent_text
+    bot_mocks.send_long.assert_awaited_once()
+    sent_text = bot_mocks.send_long.call_args.args[2]
+    assert expected in sent_text
 
 
-@pytest.mark.asyncio
-async def test_execute_balance(mock_update, mock_context, mocker):
+async def test_execute_balance(mock_update, mock_context, mocker, bot_mocks):
     """Tests the core balance execution logic."""
-    mocker.patch('bot_commands.get_rpc_url', return_value="fake_rpc")
     mocker.patch('bot_commands.BIRDEYE_API_KEY', "fake_key")
     mock_get_balance = mocker.patch('bot_commands.get_wallet_balance', AsyncMock(return_value="Formatted Balance"))
-    mock_send_long = mocker.patch('bot_commands.send_long_message', new_callable=AsyncMock)
 
     await _execute_balance(mock_update, mock_context, "test_address")
 
     mock_get_balance.assert_awaited_once_with("test_address", "fake_rpc", "fake_key")
-    # Check that placeholder is sent, deleted, and final message sent via helper
+    # Check that the placeholder is sent and then edited in place
     assert mock_context.bot.send_message.call_count == 1
+    mock_context.bot.edit_message_text.assert_awaited_once()
+    assert mock_context.bot.edit_message_text.call_args.kwargs['text'] == "Formatted Balance"
+    mock_context.bot.delete_message.assert_not_called()
+    bot_mocks.send_long.assert_not_awaited()
+
+    # Balances too long for one message are split via the helper instead
+    mock_get_balance.return_value = "x" * 5000
+    await _execute_balance(mock_update, mock_context, "test_address")
+
     assert mock_context.bot.delete_message.call_count == 1
-    mock_send_long.assert_awaited_once()
-    assert "Formatted Balance" in mock_send_long.call_args.args[2]
+    bot_mocks.send_long.assert_awaited_once()
 
 
-@pytest.mark.asyncio
-async def test_text_handler_for_balance(mock_update, mock_context, mocker):
-    """Tests the text handler conversation flow for getting a balance."""
-    mock_resolve = mocker.patch('bot_commands.resolve_address', return_value="resolved_address")
-    mock_execute_balance = mocker.patch('bot_commands._execute_balance', new_callable=AsyncMock)
+async def test_execute_scan_sends_csv(mock_update, mock_context, mocker, areturn):
+    """Tests that scan results are sent as a UTF-8 CSV document."""
+    transactions = [{
+        'type': 'transfer', 'wallet_1': 'src', 'wallet_2': 'dst', 'amount': 1.5, 'authority': None,
+        'timestamp': '2024-01-01 00:00:00', 'signature': 'sig', 'block_number': 1, 'link': 'https://solscan.io/tx/sig'
+    }]
+    mocker.patch('bot_commands.fetch_and_parse_transactions', areturn(transactions))
+    # The spool file is closed once the upload returns, so read it while "sending"
+    sent = {}
+    mock_context.bot.send_document.side_effect = lambda **kwargs: sent.setdefault('csv', kwargs['document'].input_file_content.read())
+
+    await _execute_scan(mock_update, mock_context, "test_address")
+
+    mock_context.bot.send_document.assert_awaited_once()
+    document = mock_context.bot.send_document.call_args.kwargs['document']
+    assert document.filename == "transactions_test_addre.csv"
+    assert document.input_file_content.closed
+    assert sent['csv'].decode('utf-8').splitlines() == [
+        "type,wallet_1,wallet_2,amount,authority,timestamp,signature,block_number,link",
+        "transfer,src,dst,1.5,,2024-01-01 00:00:00,sig,1,https://solscan.io/tx/sig",
+    ]
+
+
+async def test_execute_chart_for_token_mint(mock_update, mock_context, mocker):
+    """Tests that a token mint chart is sent without looking up wallet token accounts."""
+    transactions = [{'amount': '10', 'timestamp': '2024-01-01 00:00:00'}]
+    mock_fetch = mocker.patch('bot_commands.fetch_and_parse_transactions', AsyncMock(return_value=transactions))
+    mock_details = mocker.patch('bot_commands.get_token_details', AsyncMock(return_value={'decimals': 6}))
+    mock_client = mocker.patch('bot_commands.get_solana_client')
+    mock_chart = mocker.patch('bot_commands.create_daily_volume_chart', return_value=b"png")
 
+    await _execute_chart(mock_update, mock_context, "mint_address")
+
+    mock_fetch.assert_awaited_once()
+    mock_details.assert_awaited_once_with("mint_address", "fake_rpc")
+    mock_client.assert_not_called()
+    mock_chart.assert_called_once_with(transactions, "mint_address", [], True)
+    mock_context.bot.send_photo.assert_awaited_once()
+    assert "Total Volume:** `10.00`" in mock_context.bot.send_photo.call_args.kwargs['caption']
+
+
+async def test_text_handler_for_balance(mock_update, mock_context, bot_mocks):
+    """Tests the text handler conversation flow for getting a balance."""
     # Simulate user clicking "Wallet Balance" button, bot asks for address
     mock_context.user_data['state'] = 'balance'
 
@@ -88,20 +178,139 @@ async def test_text_handler_for_balance(mock_update, mock_context, mocker):
     mock_update.message.text = "my_wallet_alias"
     await text_handler(mock_update, mock_context)
 
-    mock_resolve.assert_called_once_with(12345, "my_wallet_alias")
-    mock_execute_balance.assert_awaited_once_with(mock_update, mock_context, "resolved_address")
+    bot_mocks.resolve.assert_called_once_with(12345, "my_wallet_alias")
+    bot_mocks.execute_balance.assert_awaited_once_with(mock_update, mock_context, "resolved_address")
     # State should be cleared after execution
     assert 'state' not in mock_context.user_data
 
 
-@pytest.mark.asyncio
-async def test_cancel_command(mock_update, mock_context, mocker):
+async def test_text_handler_for_scan_limit(mock_update, mock_context, bot_mocks):
+    """Tests that a custom limit is parsed once and rejected when not positive."""
+    mock_context.user_data.update({'state': 'awaiting_limit_for_scan', 'action': 'scan', 'address': 'addr'})
+    mock_update.message.text = "abc"
+    await text_handler(mock_update, mock_context)
+
+    mock_update.message.reply_text.assert_awaited_once_with("❌ Invalid format. Please enter a positive number.")
+    bot_mocks.execute_scan.assert_not_awaited()
+
+    mock_update.message.text = "250"
+    await text_handler(mock_update, mock_context)
+
+    bot_mocks.execute_scan.assert_awaited_once_with(mock_update, mock_context, 'addr', limit=250)
+
+
+async def test_monitor_rejects_invalid_address(mock_update, mock_context, mocker, bot_mocks):
+    """Tests that malformed addresses are rejected before a monitor task is started."""
+    bot_mocks.resolve.side_effect = lambda chat_id, value: value
+    mock_start = mocker.patch('bot_commands.start_monitoring_task')
+
+    # Right length, but '0' and 'O' are not valid base58 characters
+    mock_context.args = ["0" * 20 + "O" * 20]
+    await monitor(mock_update, mock_context)
+
+    mock_update.message.reply_text.assert_awaited_once_with("❌ Invalid Solana address.", parse_mode='Markdown')
+    mock_start.assert_not_called()
+
+
+async def test_schedule_and_unschedule_use_job_index(mock_update, mock_context):
+    """Tests that scheduled jobs are tracked by name in bot_data and replaced or removed through it."""
+    first_job, second_job = MagicMock(), MagicMock()
+    mock_context.job_queue.run_daily.side_effect = [first_job, second_job]
+
+    mock_context.args = ["my_wallet", "15:30"]
+    await schedule(mock_update, mock_context)
+    mock_context.args = ["my_wallet", "16:00"]
+    await schedule(mock_update, mock_context)
+
+    first_job.schedule_removal.assert_called_once()
+    assert mock_context.bot_data["scheduled_jobs"] == {"scan_12345_my_wallet": second_job}
+
+    mock_context.args = ["my_wallet"]
+    await unschedule(mock_update, mock_context)
+
+    second_job.schedule_removal.assert_called_once()
+    assert mock_context.bot_data["scheduled_jobs"] == {}
+    mock_context.job_queue.get_jobs_by_name.assert_not_called()
+
+
+async def test_cancel_command(mock_update, mock_context, bot_mocks):
     """Tests that the /cancel command clears state and shows main menu."""
-    mock_main_menu = mocker.patch('bot_commands.main_menu', new_callable=AsyncMock)
     mock_context.user_data['state'] = 'awaiting_something'
 
     await cancel(mock_update, mock_context)
 
     assert 'state' not in mock_context.user_data
     mock_update.message.reply_text.assert_called_once_with("Operation cancelled. Returning to the main menu.")
-    mock_main_menu.assert_awaited_once()
+    bot_mocks.main_menu.assert_awaited_once()
+
+
+def test_compute_chart_stats_for_wallet():
+    """Tests incoming/outgoing statistics, including token accounts and unparsable amounts."""
+    transactions = [
+        {'amount': '10', 'wallet_1': 'my_wallet', 'wallet_2': 'other', 'authority': ''},
+        {'amount': '5', 'wallet_1': 'other', 'wallet_2': 'my_wallet', 'authority': ''},
+        {'amount': 2.5, 'wallet_1': 'other', 'wallet_2': 'my_token_account', 'authority': None},
+        {'amount': 'N/A', 'wallet_1': 'my_wallet', 'wallet_2': 'other', 'authority': ''},
+    ]
+
+    caption = _compute_chart_stats(transactions, 'my_wallet', ['my_token_account'], is_token_mint=False)
+
+    assert "Total Incoming:** `7.50` in `2` txs" in caption
+    assert "Total Outgoing:** `10.00` in `1` txs" in caption
+    assert "Net Flow:** `-2.50`" in caption
+
+
+def test_compute_chart_stats_for_token_mint():
+    """Tests volume statistics for a token mint and the empty case."""
+    transactions = [{'amount': '1000'}, {'amount': '500'}, {'amount': None}]
+
+    caption = _compute_chart_stats(transactions, 'mint', [], is_token_mint=True)
+
+    assert "Total Volume:** `1,500.00`" in caption
+    assert "Transactions:** `2`" in caption
+    assert "Avg. Tx Size:** `750.00`" in caption
+    assert _compute_chart_stats([{'amount': 'bad'}], 'mint', [], is_token_mint=True) == ""
+
+
+def test_parse_utc_date():
+    """Tests date parsing and the end-of-day offset used for date ranges."""
+    start = _parse_utc_date("2024-03-05")
+
+    assert start == datetime(2024, 3, 5, tzinfo=timezone.utc)
+    assert start + _END_OF_DAY_OFFSET == datetime(2024, 3, 5, 23, 59, 59, 999999, tzinfo=timezone.utc)
+    # Unpadded month and day are accepted, other ISO 8601 spellings are not
+    assert _parse_utc_date("2024-3-5") == start
+    for value in ("05/03/2024", "20240305", "2024-W10-2"):
+        with pytest.raises(ValueError):
+            _parse_utc_date(value)
+
+
+async def test_send_long_message_splits_on_lines(mock_context):
+    """Tests that long text is split into parts under the limit without breaking lines."""
+    line = "x" * 99
+    text = "\n".join([line] * 100)
+
+    await send_long_message(mock_context, 12345, text)
+
+    sent = [c.kwargs['text'] for c in mock_context.bot.send_message.await_args_list]
+    assert len(sent) == 3
+    assert all(len(part) <= 4096 for part in sent)
+    assert "\n".join(sent) == text
+
+
+def test_parse_scan_args():
+    """Tests the option parsing shared by /scan and /chart."""
+    limit_msg = "limit `{limit}`"
+
+    assert _parse_scan_args(["addr"], limit_msg) == ({'limit': 100}, "limit `100`")
+    assert _parse_scan_args(["addr", "--limit", "500"], limit_msg) == ({'limit': 500}, "limit `500`")
+    assert _parse_scan_args(["addr", "--blocks", "10-20"], limit_msg)[0] == {'limit': None, 'start_block': 10, 'end_block': 20}
+
+    params, _ = _parse_scan_args(["addr", "--date", "2024-03-05:2024-03-06"], limit_msg)
+    assert params['start_date'] == datetime(2024, 3, 5, tzinfo=timezone.utc)
+    assert params['end_date'] == datetime(2024, 3, 6, tzinfo=timezone.utc) + _END_OF_DAY_OFFSET
+
+    with pytest.raises(ValueError, match="--blocks START-END"):
+        _parse_scan_args(["addr", "--blocks", "10-x"], limit_msg)
+    with pytest.raises(ValueError, match="--date YYYY-MM-DD"):
+        _parse_scan_args(["addr", "--date", "2024-03-05:2024-03-06:2024-03-07"], limit_msg)
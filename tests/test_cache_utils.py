@@ -0,0 +1,51 @@
+from cache_utils import LRUCache, TTLCache
+
+
+def test_ttl_cache_get_and_set():
+    """Tests that stored values are returned until they expire."""
+    cache = TTLCache(maxsize=10, ttl=60)
+    cache["a"] = 1
+
+    assert cache.get("a") == 1
+    assert "a" in cache
+    assert cache.get("missing") is None
+    assert cache.get("missing", "default") == "default"
+
+
+def test_ttl_cache_expiry(mocker):
+    """Tests that entries are dropped once their TTL has passed."""
+    mock_time = mocker.patch('cache_utils.time.monotonic', return_value=1000.0)
+    cache = TTLCache(maxsize=10, ttl=60)
+    cache["a"] = 1
+
+    mock_time.return_value = 1059.0
+    assert cache.get("a") == 1
+
+    mock_time.return_value = 1061.0
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_ttl_cache_evicts_oldest_when_full():
+    """Tests that the oldest entry is evicted when maxsize is reached."""
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache["a"] = 1
+    cache["b"] = 2
+    cache["c"] = 3
+
+    assert "a" not in cache
+    assert cache.get("b") == 2
+    assert cache.get("c") == 3
+
+
+def test_lru_cache_evicts_least_recently_used():
+    """Tests that reading an entry protects it from eviction."""
+    cache = LRUCache(maxsize=2)
+    cache["a"] = 1
+    cache["b"] = 2
+    assert cache.get("a") == 1
+    cache["c"] = 3
+
+    assert "b" not in cache
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
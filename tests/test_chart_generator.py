@@ -1,6 +1,5 @@
 import pytest
 from io import BytesIO
-from chart_generator import create_daily_volume_chart
 
 # Mock transactions data
 WALLET_TRANSACTIONS = [
@@ -15,31 +14,38 @@ TOKEN_MINT_TRANSACTIONS = [
 ]
 
 
-def test_create_chart_with_no_transactions():
+@pytest.fixture
+def create_chart(_warm_matplotlib):
+    """Imports the chart module (and matplotlib/pandas with it) only when a chart test runs."""
+    from chart_generator import create_daily_volume_chart
+    return create_daily_volume_chart
+
+
+def test_create_chart_with_no_transactions(create_chart):
     """Tests that the function returns None for empty transaction list."""
-    chart = create_daily_volume_chart([], 'some_address')
+    chart = create_chart([], 'some_address')
     assert chart is None
 
 
-def test_create_chart_for_wallet():
+def test_create_chart_for_wallet(create_chart):
     """Tests chart creation for a regular wallet address."""
-    chart = create_daily_volume_chart(WALLET_TRANSACTIONS, 'my_wallet', is_token_mint=False)
+    chart = create_chart(WALLET_TRANSACTIONS, 'my_wallet', is_token_mint=False)
     assert isinstance(chart, BytesIO)
     assert len(chart.getvalue()) > 0
 
 
-def test_create_chart_for_token_mint():
+def test_create_chart_for_token_mint(create_chart):
     """Tests chart creation for a token mint address."""
-    chart = create_daily_volume_chart(TOKEN_MINT_TRANSACTIONS, 'token_mint_address', is_token_mint=True)
+    chart = create_chart(TOKEN_MINT_TRANSACTIONS, 'token_mint_address', is_token_mint=True)
     assert isinstance(chart, BytesIO)
     assert len(chart.getvalue()) > 0
 
 
-def test_create_chart_with_unplottable_data():
+def test_create_chart_with_unplottable_data(create_chart):
     """Tests that the function returns None if processed data is empty."""
     # Transactions with amounts that will be dropped
     bad_transactions = [
         {'timestamp': '2023-01-01 10:00:00', 'amount': 'not_a_number'},
     ]
-    chart = create_daily_volume_chart(bad_transactions, 'some_address')
+    chart = create_chart(bad_transactions, 'some_address')
     assert chart is None
@@ -1,3 +1,4 @@
+import os
 import pytest
 
 import data_manager  # To patch USER_DATA_FILE
@@ -6,22 +7,33 @@ from data_manager import load_user_data, save_user_data, resolve_address, get_rp
 MOCK_DEFAULT_RPC = "https://default.rpc.com"
 
 
-@pytest.fixture(autouse=True)
-def mock_default_rpc(mocker):
-    """Mocks the default RPC URL for all tests in this file."""
-    mocker.patch('data_manager.DEFAULT_RPC_URL', MOCK_DEFAULT_RPC)
+@pytest.fixture(scope="module", autouse=True)
+def mock_default_rpc(module_mocker):
+    """Mocks the default RPC URL once for all tests in this file."""
+    module_mocker.patch('data_manager.DEFAULT_RPC_URL', MOCK_DEFAULT_RPC)
 
 
-def test_save_and_load_user_data(tmp_path):
-    """Tests that data can be saved and loaded back correctly."""
+async def test_save_and_load_user_data(tmp_path):
+    """Tests that data can be saved to disk and loaded back correctly."""
     file_path = tmp_path / "user_data.json"
     data_manager.USER_DATA_FILE = str(file_path)
 
     test_data = {"123": {"aliases": {"wsol": "sol_address"}}}
-    save_user_data(test_data)
+    await save_user_data(test_data)
 
     loaded_data = load_user_data()
     assert loaded_data == test_data
+    # The write goes through a temporary file that is renamed into place
+    assert os.listdir(tmp_path) == ["user_data.json"]
+
+
+def test_payload_round_trip():
+    """Tests the encode/decode pair used for the user data file, without touching disk."""
+    test_data = {"123": {"aliases": {"кошелёк": "sol_address"}, "rpc_url": "https://rpc.example"}}
+    payload = data_manager._json_dumps(test_data)
+
+    assert isinstance(payload, bytes)
+    assert data_manager._json_loads(payload) == test_data
 
 
 def test_load_non_existent_data(tmp_path):
@@ -63,3 +75,71 @@ def test_get_rpc_url(mocker):
     assert get_rpc_url(456) == MOCK_DEFAULT_RPC
     # User not in data, should return default
     assert get_rpc_url(789) == MOCK_DEFAULT_RPC
+
+
+async def test_load_user_data_reuses_parsed_data(tmp_path, mocker):
+    """Tests that the file is only re-parsed after it changes on disk."""
+    file_path = tmp_path / "user_data.json"
+    data_manager.USER_DATA_FILE = str(file_path)
+    await save_user_data({"123": {"aliases": {}}})
+
+    mock_json_load = mocker.patch('data_manager._json_loads', wraps=data_manager._json_loads)
+    first = load_user_data()
+    assert load_user_data() is first
+    mock_json_load.assert_not_called()
+
+    file_path.write_text('{"456": {}}')
+    os.utime(file_path, ns=(0, 0))  # Force a different mtime even on coarse filesystems
+    assert load_user_data() == {"456": {}}
+    mock_json_load.assert_called_once()
+
+
+async def test_lookups_are_memoized_until_save(tmp_path):
+    """Tests that alias lookups are cached and refreshed after the data is saved."""
+    data_manager.USER_DATA_FILE = str(tmp_path / "user_data.json")
+    data = {"123": {"aliases": {"wsol": "sol_address"}}}
+    await save_user_data(data)
+
+    assert resolve_address(123, "wsol") == "sol_address"
+    assert resolve_address(123, "wsol") == "sol_address"
+    assert data_manager._cached_alias.cache_info().hits == 1
+
+    data["123"]["aliases"]["wsol"] = "new_address"
+    data["123"]["rpc_url"] = "https://custom.rpc.com"
+    await save_user_data(data)
+    assert resolve_address(123, "wsol") == "new_address"
+    assert get_rpc_url(123) == "https://custom.rpc.com"
+
+
+async def test_save_skips_unchanged_data(tmp_path, mocker):
+    """Tests that saving identical data does not rewrite the file."""
+    file_path = tmp_path / "user_data.json"
+    data_manager.USER_DATA_FILE = str(file_path)
+    await save_user_data({"123": {"rpc_url": "https://custom.rpc.com"}})
+
+    mock_write = mocker.patch('data_manager._write_user_data', wraps=data_manager._write_user_data)
+    await save_user_data({"123": {"rpc_url": "https://custom.rpc.com"}})
+    mock_write.assert_not_called()
+
+    # A file changed behind our back is rewritten even if the data matches the last save
+    file_path.write_text("{}")
+    os.utime(file_path, ns=(0, 0))
+    await save_user_data({"123": {"rpc_url": "https://custom.rpc.com"}})
+    mock_write.assert_called_once()
+
+
+async def test_save_does_not_hold_lock_during_fsync(tmp_path, mocker):
+    """Tests that loads aren't blocked while a save is flushing to disk."""
+    data_manager.USER_DATA_FILE = str(tmp_path / "user_data.json")
+    real_fsync = os.fsync
+    lock_held = []
+
+    def fsync(fd):
+        lock_held.append(data_manager._user_data_lock.locked())
+        real_fsync(fd)
+    mocker.patch('data_manager.os.fsync', side_effect=fsync)
+
+    await save_user_data({"123": {"aliases": {"a": "b"}}})
+
+    assert lock_held == [False]
+    assert load_user_data() == {"123": {"aliases": {"a": "b"}}}
@@ -1,9 +1,29 @@
 import pytest
-from unittest.mock import AsyncMock, MagicMock
-from monitoring import format_transaction_notification
+from types import MappingProxyType
+from unittest.mock import AsyncMock
+from monitoring import _wait_for_transaction, format_transaction_notification
 
-# Mock transaction info from get_transaction RPC call result
-SAMPLE_TX_INFO_SOL = {
+
+def _frozen(value):
+    """Recursively turns dicts into read-only mappings and lists into tuples."""
+    if isinstance(value, dict):
+        return MappingProxyType({k: _frozen(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return tuple(_frozen(v) for v in value)
+    return value
+
+
+def _thawed(value):
+    """Builds a mutable deep copy of a frozen sample for tests that modify it."""
+    if isinstance(value, MappingProxyType):
+        return {k: _thawed(v) for k, v in value.items()}
+    if isinstance(value, tuple):
+        return [_thawed(v) for v in value]
+    return value
+
+
+# Mock transaction info from get_transaction RPC call result, read-only so tests can't leak changes
+SAMPLE_TX_INFO_SOL = _frozen({
     "meta": {
         "err": None,
         "preBalances": [10000000000, 5000000000],
@@ -17,15 +37,15 @@ SAMPLE_TX_INFO_SOL = {
         }
     },
     "signature": "sol_sig_123"
-}
+})
 
-SAMPLE_TX_INFO_TOKEN = {
+SAMPLE_TX_INFO_TOKEN = _frozen({
     "meta": {
         "err": None,
         "preBalances": [10000000000],
         "postBalances": [10000000000],
         "preTokenBalances": [
-            {"mint": "USDC_mint", "owner": "my_wallet", "uiTokenAmount": {"uiAmountString": "100.0"}}
+            {"mint": "USDC_mint", "owner": "my_wallet", "uiTokenAmount": {"uiAmount": 100.0, "uiAmountString": "100.0"}}
         ],
         "postTokenBalances": [
             {"mint": "USDC_mint", "owner": "my_wallet", "uiTokenAmount": {"uiAmountString": "50.0"}}
@@ -37,74 +57,51 @@ SAMPLE_TX_INFO_TOKEN = {
         }
     },
     "signature": "token_sig_456"
-}
-
-
-@pytest.mark.asyncio
-async def test_format_notification_sol_send(mocker):
-    """Tests formatting for sending SOL."""
-    mocker.patch('monitoring.get_token_prices', AsyncMock(return_value={}))
-
-    mock_client = AsyncMock()
-    mock_client.get_token_accounts_by_owner.return_value = {"result": {"value": []}}
-    mock_async_client_class = MagicMock()
-    mock_async_client_class.return_value.__aenter__.return_value = mock_client
-    mocker.patch('monitoring.AsyncCustomSolanaClient', mock_async_client_class)
-
-    message = await format_transaction_notification(SAMPLE_TX_INFO_SOL, "my_wallet", "fake_rpc")
-
-    assert "🔴 Отправлено" in message
-    assert "1.000000" in message
-    assert "SOL" in message
-    assert "sol_sig_123" in message
-
+})
 
-@pytest.mark.asyncio
-async def test_format_notification_token_send(mocker):
-    """Tests formatting for sending an SPL token."""
-    mock_prices = {"USDC_mint": {"symbol": "USDC"}}
-    mocker.patch('monitoring.get_token_prices', AsyncMock(return_value=mock_prices))
 
-    mock_client = AsyncMock()
-    mock_client.get_token_accounts_by_owner.return_value = {"result": {"value": []}}
-    mock_async_client_class = MagicMock()
-    mock_async_client_class.return_value.__aenter__.return_value = mock_client
-    mocker.patch('monitoring.AsyncCustomSolanaClient', mock_async_client_class)
+def _failed_tx():
+    tx = _thawed(SAMPLE_TX_INFO_SOL)
+    tx["meta"]["err"] = {"InstructionError": [0, "some error"]}
+    return _frozen(tx)
 
-    message = await format_transaction_notification(SAMPLE_TX_INFO_TOKEN, "my_wallet", "fake_rpc")
 
-    assert "🔴 Отправлено" in message
-    assert "50.000000" in message
-    assert "USDC" in message
-    assert "token_sig_456" in message
+def _no_change_tx():
+    tx = _thawed(SAMPLE_TX_INFO_TOKEN)
+    # Make pre and post balances the same
+    tx["meta"]["postTokenBalances"][0]["uiTokenAmount"]["uiAmountString"] = "100.0"
+    return _frozen(tx)
 
 
-@pytest.mark.asyncio
-async def test_format_notification_failed_tx():
-    """Tests that failed transactions produce no notification."""
-    failed_tx = SAMPLE_TX_INFO_SOL.copy()
-    failed_tx["meta"]["err"] = {"InstructionError": [0, "some error"]}
+@pytest.fixture(scope="module", autouse=True)
+def token_symbols(module_mocker, areturn):
+    """Resolves token names without Birdeye for every notification test."""
+    module_mocker.patch('monitoring.get_token_symbols', areturn({"USDC_mint": "USDC"}))
 
-    message = await format_transaction_notification(failed_tx, "my_wallet", "fake_rpc")
 
-    assert message == ""
+@pytest.mark.parametrize("tx_info, expected", [
+    (SAMPLE_TX_INFO_SOL, ["🔴 Отправлено", "1.000000", "SOL", "sol_sig_123"]),
+    (SAMPLE_TX_INFO_TOKEN, ["🔴 Отправлено", "50.000000", "USDC", "token_sig_456"]),
+    (_failed_tx(), []),
+    (_no_change_tx(), []),
+], ids=["sol_send", "token_send", "failed_tx", "no_change"])
+async def test_format_notification(tx_info, expected):
+    """Tests notification text for SOL and token sends, and that failed or no-op transactions produce none."""
+    message = await format_transaction_notification(tx_info, "my_wallet", "fake_rpc")
 
+    if not expected:
+        assert message == ""
+    for text in expected:
+        assert text in message
 
-@pytest.mark.asyncio
-async def test_format_notification_no_change(mocker):
-    """Tests that transactions with no balance change for the wallet produce no notification."""
-    tx_no_change = SAMPLE_TX_INFO_TOKEN.copy()
-    # Make pre and post balances the same
-    tx_no_change["meta"]["postTokenBalances"][0]["uiTokenAmount"]["uiAmountString"] = "100.0"
 
-    mocker.patch('monitoring.get_token_prices', AsyncMock(return_value={}))
-    
+async def test_wait_for_transaction_polls_until_available(_no_retry_sleep):
+    """Tests that a notified transaction is re-fetched with backoff until the RPC returns it."""
+    mock_sleep = _no_retry_sleep
+    mock_sleep.reset_mock()
     mock_client = AsyncMock()
-    mock_client.get_token_accounts_by_owner.return_value = {"result": {"value": []}}
-    mock_async_client_class = MagicMock()
-    mock_async_client_class.return_value.__aenter__.return_value = mock_client
-    mocker.patch('monitoring.AsyncCustomSolanaClient', mock_async_client_class)
-
-    message = await format_transaction_notification(tx_no_change, "my_wallet", "fake_rpc")
+    mock_client.get_transaction.side_effect = [{"result": None}, {"result": None}, {"result": {"slot": 1}}]
 
-    assert message == ""
+    assert await _wait_for_transaction(mock_client, "sig") == {"result": {"slot": 1}}
+    mock_client.get_transaction.assert_awaited_with("sig", commitment="confirmed")
+    assert [c.args[0] for c in mock_sleep.await_args_list] == [0.25, 0.5]
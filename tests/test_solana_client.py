@@ -1,94 +1,254 @@
+import asyncio
 import pytest
-import ujson
 from unittest.mock import AsyncMock, MagicMock
-from solana_client import AsyncCustomSolanaClient
+import solana_client
+from solana_client import AsyncCustomSolanaClient, get_solana_client, close_shared_session
 
 
-@pytest.mark.asyncio
-async def test_make_request_success(mocker):
+class _Posted:
+    """Minimal stand-in for the context manager session.post() returns."""
+
+    def __init__(self, response):
+        self.response = response
+
+    async def __aenter__(self):
+        return self.response
+
+    async def __aexit__(self, *exc_info):
+        return None
+
+
+@pytest.fixture(scope="module")
+def _session_template():
+    session = MagicMock()
+    session.close = AsyncMock()
+    return session
+
+
+@pytest.fixture
+def mock_session(_session_template, mocker):
+    """Provides an aiohttp.ClientSession-shaped mock, also returned by any ClientSession() the client creates."""
+    _session_template.reset_mock()
+    # Wiping return values on the session itself would also break its magic methods, e.g. __bool__
+    _session_template.post.reset_mock(return_value=True, side_effect=True)
+    mocker.patch('solana_client.aiohttp.ClientSession', return_value=_session_template)
+    return _session_template
+
+
+async def test_make_request_success(mock_session, areturn):
     """Tests a successful request."""
-    mock_session = MagicMock()
-    mock_session.close = AsyncMock()
     mock_response = MagicMock()
     mock_response.status = 200
     mock_response.raise_for_status.return_value = None
-    mock_response.json = AsyncMock(return_value={"result": "success"})
+    mock_response.json = areturn({"result": "success"})
 
     # Configure the async context manager for session.post
     mock_session.post.return_value.__aenter__.return_value = mock_response
 
-    mocker.patch('solana_client.aiohttp.ClientSession', return_value=mock_session)
-
     async with AsyncCustomSolanaClient("http://fake.rpc.com") as client:
         result = await client._make_request("test_method", [])
         assert result == {"result": "success"}
         mock_session.post.assert_called_once()
 
 
-@pytest.mark.asyncio
-async def test_make_request_retry_on_429(mocker):
+async def test_make_request_retry_on_429(mock_session, areturn):
     """Tests that the client retries on a 429 status code."""
-    mock_session = MagicMock()
-    mock_session.close = AsyncMock()
-
     # First response is 429, second is 200
     response_429 = MagicMock()
     response_429.status = 429
     response_ok = MagicMock()
     response_ok.status = 200
-    response_ok.json = AsyncMock(return_value={"result": "success after retry"})
-
-    # Set up the context manager mock for side_effect
-    enter_429 = AsyncMock(return_value=response_429)
-    exit_mock = AsyncMock()
-    enter_ok = AsyncMock(return_value=response_ok)
-
-    mock_session.post.side_effect = [
-        MagicMock(__aenter__=enter_429, __aexit__=exit_mock),
-        MagicMock(__aenter__=enter_ok, __aexit__=exit_mock)
-    ]
+    response_ok.json = areturn({"result": "success after retry"})
 
-    mocker.patch('solana_client.aiohttp.ClientSession', return_value=mock_session)
-    mocker.patch('asyncio.sleep', AsyncMock())  # patch sleep to not wait
+    mock_session.post.side_effect = [_Posted(response_429), _Posted(response_ok)]
 
     async with AsyncCustomSolanaClient("http://fake.rpc.com") as client:
         result = await client._make_request("test_method", [], retry_count=2)
         assert result == {"result": "success after retry"}
         assert mock_session.post.call_count == 2
+        # The 429 halves the number of requests allowed in flight
+        assert client.concurrency_limit == 25
 
 
-@pytest.mark.asyncio
-async def test_make_request_auth_failure_on_403(mocker):
+async def test_make_request_auth_failure_on_403(mock_session):
     """Tests that the client raises an exception on a 403 status code."""
-    mock_session = MagicMock()
-    mock_session.close = AsyncMock()
     response_403 = MagicMock()
     response_403.status = 403
 
     mock_session.post.return_value.__aenter__.return_value = response_403
 
-    mocker.patch('solana_client.aiohttp.ClientSession', return_value=mock_session)
-
     with pytest.raises(Exception, match="Authentication failed"):
         async with AsyncCustomSolanaClient("http://fake.rpc.com") as client:
             await client._make_request("test_method", [])
 
 
-@pytest.mark.asyncio
-async def test_get_transaction_uses_cache(mocker):
+async def test_get_transaction_uses_cache(mock_session):
     """Tests that getTransaction method uses the internal cache."""
-    mock_session = MagicMock()
-    mock_session.close = AsyncMock()
-    mocker.patch('solana_client.aiohttp.ClientSession', return_value=mock_session)
-
     async with AsyncCustomSolanaClient("http://fake.rpc.com") as client:
         # Manually set a cache entry
-        params = ["fake_sig", {"encoding": "jsonParsed", "maxSupportedTransactionVersion": 0}]
-        cache_key = f'getTransaction:{ujson.dumps(params)}'
-        client.transaction_cache[cache_key] = {"result": "cached_data"}
+        client.transaction_cache[("fake_sig", "jsonParsed")] = {"result": "cached_data"}
 
         result = await client.get_transaction("fake_sig")
 
         assert result == {"result": "cached_data"}
         # _make_request should return from cache before making a POST call
         mock_session.post.assert_not_called()
+
+
+async def test_borrowed_session_is_not_closed(mocker):
+    """Tests that a pooled session passed in by the caller is reused and left open."""
+    mock_session_class = mocker.patch('solana_client.aiohttp.ClientSession')
+    shared_session = MagicMock()
+    shared_session.close = AsyncMock()
+
+    async with AsyncCustomSolanaClient("http://fake.rpc.com", session=shared_session) as client:
+        assert client.session is shared_session
+
+    mock_session_class.assert_not_called()
+    shared_session.close.assert_not_called()
+
+
+async def test_get_solana_client_is_pooled_per_rpc_url(mocker):
+    """Tests that clients are reused per RPC URL and dropped when the shared session closes."""
+    session = MagicMock(closed=False)
+    session.close = AsyncMock()
+    mocker.patch('solana_client.get_shared_session', return_value=session)
+    mocker.patch.object(solana_client, '_SHARED_SESSION', session)
+    mocker.patch.object(solana_client, '_CLIENTS', solana_client.LRUCache(maxsize=2))
+
+    client = get_solana_client("http://rpc-a")
+    assert get_solana_client("http://rpc-a") is client
+    client_b = get_solana_client("http://rpc-b")
+    assert client_b is not client
+    assert client.session is session
+
+    # Only the most recently used URLs keep a client
+    get_solana_client("http://rpc-a")
+    get_solana_client("http://rpc-c")
+    assert get_solana_client("http://rpc-a") is client
+    assert get_solana_client("http://rpc-b") is not client_b
+
+    await close_shared_session()
+
+    session.close.assert_awaited_once()
+    assert get_solana_client("http://rpc-a") is not client
+
+
+async def test_get_transactions_batches_and_orders_by_id(mock_session):
+    """Tests that a batch is sent as one POST and responses are matched to calls by id."""
+    mock_response = MagicMock()
+    mock_response.status = 200
+    mock_response.json = AsyncMock(side_effect=lambda loads: [
+        {"id": payload[1]["id"], "result": "tx_b"},
+        {"id": payload[0]["id"], "result": "tx_a"},
+    ])
+    mock_session.post.return_value.__aenter__.return_value = mock_response
+
+    client = AsyncCustomSolanaClient("http://fake.rpc.com", session=mock_session)
+    payload = None
+
+    def capture(*args, **kwargs):
+        nonlocal payload
+        payload = solana_client._json_loads(kwargs["data"])
+        return mock_session.post.return_value
+    mock_session.post.side_effect = capture
+
+    assert await client.get_transactions(["sig_a", "sig_b"]) == [{"id": 1, "result": "tx_a"}, {"id": 2, "result": "tx_b"}]
+    mock_session.post.assert_called_once()
+    # Both are cached now, so asking again doesn't hit the network
+    assert [res["result"] for res in await client.get_transactions(["sig_b", "sig_a"])] == ["tx_b", "tx_a"]
+    mock_session.post.assert_called_once()
+
+
+def test_concurrency_limit_backs_off_and_recovers(mocker):
+    """Tests that 429s shrink the concurrency limit down to a floor and successes grow it back."""
+    client = AsyncCustomSolanaClient("http://fake.rpc.com", session=MagicMock())
+    for _ in range(10):
+        client._on_rate_limited()
+    assert client.concurrency_limit == solana_client._MIN_CONCURRENCY
+
+    for _ in range(solana_client._RAMP_UP_AFTER):
+        client._on_success()
+    assert client.concurrency_limit == solana_client._MIN_CONCURRENCY * 2
+
+
+async def test_make_request_sends_preserialized_payload(mock_session, areturn):
+    """Tests that the request body is valid JSON-RPC built from the pre-serialized params."""
+    mock_response = MagicMock()
+    mock_response.status = 200
+    mock_response.json = areturn({"result": "ok"})
+    mock_session.post.return_value.__aenter__.return_value = mock_response
+
+    client = AsyncCustomSolanaClient("http://fake.rpc.com", session=mock_session)
+    await client.get_transaction("sig_a")
+
+    body = solana_client._json_loads(mock_session.post.call_args.kwargs["data"])
+    assert body == {
+        "jsonrpc": "2.0", "id": 1, "method": "getTransaction",
+        "params": ["sig_a", {"encoding": "jsonParsed", "maxSupportedTransactionVersion": 0}],
+    }
+
+
+async def test_get_transaction_without_cache_is_not_stored(mock_session):
+    """Tests that cache=False fetches are returned but not kept on the client."""
+    mock_response = MagicMock()
+    mock_response.status = 200
+    # A single call first (id 1), then a one-call batch (id 2)
+    mock_response.json = AsyncMock(side_effect=[{"id": 1, "result": "tx"}, [{"id": 2, "result": "tx"}]])
+    mock_session.post.return_value.__aenter__.return_value = mock_response
+
+    client = AsyncCustomSolanaClient("http://fake.rpc.com", session=mock_session)
+
+    assert await client.get_transaction("sig_a", cache=False) == {"id": 1, "result": "tx"}
+    assert await client.get_transactions(["sig_b"], cache=False) == [{"id": 2, "result": "tx"}]
+    assert len(client.transaction_cache) == 0
+
+
+async def test_concurrent_get_transaction_calls_share_one_request(mock_session):
+    """Tests that identical getTransaction calls in flight at once are sent only once."""
+    async def slow_json(loads):
+        await asyncio.sleep(0.01)
+        return {"result": "tx"}
+
+    mock_response = MagicMock()
+    mock_response.status = 200
+    mock_response.json = slow_json
+    mock_session.post.return_value.__aenter__.return_value = mock_response
+
+    client = AsyncCustomSolanaClient("http://fake.rpc.com", session=mock_session)
+    results = await asyncio.gather(*(client.get_transaction("sig_a") for _ in range(3)))
+
+    assert results == [{"result": "tx"}] * 3
+    mock_session.post.assert_called_once()
+    assert not client._inflight
+
+
+async def test_cancelled_owner_does_not_cancel_waiters(mock_session):
+    """Tests that a waiter on an in-flight getTransaction re-sends it when the sending caller is cancelled."""
+    owner_started = asyncio.Event()
+    calls = 0
+
+    async def json(loads):
+        nonlocal calls
+        calls += 1
+        if calls == 1:
+            owner_started.set()
+            await asyncio.sleep(10)  # Cancelled before it returns
+        return {"result": "tx"}
+
+    mock_response = MagicMock()
+    mock_response.status = 200
+    mock_response.json = json
+    mock_session.post.return_value.__aenter__.return_value = mock_response
+
+    client = AsyncCustomSolanaClient("http://fake.rpc.com", session=mock_session)
+    owner = asyncio.create_task(client.get_transaction("sig_a"))
+    await owner_started.wait()
+    waiter = asyncio.create_task(client.get_transaction("sig_a"))
+    await asyncio.sleep(0)
+    owner.cancel()
+
+    assert await waiter == {"result": "tx"}
+    assert owner.cancelled()
+    assert mock_session.post.call_count == 2
+    assert not client._inflight
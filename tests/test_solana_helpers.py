@@ -1,6 +1,9 @@
+import asyncio
+import logging
 import pytest
 from unittest.mock import AsyncMock, MagicMock
-from solana_helpers import _parse_transaction_details, get_token_prices, fetch_and_parse_transactions, get_token_details, get_wallet_balance
+import solana_helpers
+from solana_helpers import _parse_transaction_details, get_token_prices, get_token_symbols, fetch_and_parse_transactions, fetch_and_parse_new_transactions, get_token_details, get_wallet_balance
 
 # Sample data for mocking API responses
 SAMPLE_SIG_INFO = {'signature': 'dummy_sig_123', 'slot': 12345678, 'blockTime': 1672531200}
@@ -37,7 +40,32 @@ SAMPLE_TX_RESPONSE = {
     'id': 1
 }
 
-@pytest.mark.asyncio
+# RPC responses shared by reference between tests; the code under test only reads them.
+_TOKEN_SUPPLY_OK = {"result": {"value": {"uiAmountString": "1000000", "decimals": 6}}}
+_MINT_ACCOUNT_INFO = {"result": {"value": {"data": {"parsed": {"type": "mint", "info": {
+    "mintAuthority": "AuthAddress",
+    "freezeAuthority": "FreezeAddress"
+}}}}}}
+_SOL_ACCOUNT_INFO = {"result": {"value": {"lamports": 1.5 * 1_000_000_000}}}
+_TOKEN_ACCOUNTS_OK = {
+    "result": {"value": [{
+        "account": {"data": {"parsed": {"info": {
+            "tokenAmount": {"uiAmountString": "123.45"},
+            "mint": "USDC_MINT"
+        }}}}
+    }]}
+}
+
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    """Makes sure cached prices and token details don't leak between tests."""
+    solana_helpers._PRICE_CACHE.clear()
+    solana_helpers._TOKEN_DETAILS_CACHE.clear()
+    solana_helpers._TRANSACTIONS_CACHE.clear()
+    solana_helpers._BIRDEYE_CLIENT = None
+    solana_helpers._SYMBOL_CACHE = None
+
 async def test_parse_transaction_details():
     """Tests the internal transaction parsing logic."""
     parsed_data = _parse_transaction_details(SAMPLE_TX_RESPONSE, SAMPLE_SIG_INFO)
@@ -52,7 +80,6 @@ async def test_parse_transaction_details():
     assert tx_info['amount'] == '123.45'
     assert tx_info['type'] == 'transferChecked'
 
-@pytest.mark.asyncio
 async def test_get_token_prices_success(mocker):
     """Tests successful fetching of token prices from Birdeye."""
     # Mock httpx response
@@ -66,9 +93,7 @@ async def test_get_token_prices_success(mocker):
     mock_async_client = AsyncMock()
     mock_async_client.get.return_value = mock_response
     
-    # Patch the client context manager to correctly handle `async with`
-    mock_async_client_class = MagicMock()
-    mock_async_client_class.return_value.__aenter__.return_value = mock_async_client
+    mock_async_client_class = MagicMock(return_value=mock_async_client)
     mocker.patch('solana_helpers.httpx.AsyncClient', mock_async_client_class)
     
     token_addresses = ["So11111111111111111111111111111111111111112"]
@@ -79,33 +104,127 @@ async def test_get_token_prices_success(mocker):
     assert "So11111111111111111111111111111111111111112" in prices
     assert prices["So11111111111111111111111111111111111111112"]["value"] == 150.5
 
-@pytest.mark.asyncio
-async def test_get_token_prices_missing_api_key(caplog):
-    """Tests that an error is logged if the API key is missing."""
-    prices = await get_token_prices(["some_address"], None)
-    assert prices == {}
-    assert "Birdeye API key is missing" in caplog.text
+async def test_get_token_prices_uses_cache(mocker):
+    """Tests that a cached price is served without another Birdeye request."""
+    mock_response = MagicMock()
+    mock_response.json.return_value = {"success": True, "data": {"value": 1.0}}
+
+    mock_async_client = AsyncMock()
+    mock_async_client.get.return_value = mock_response
+
+    mock_async_client_class = MagicMock(return_value=mock_async_client)
+    mocker.patch('solana_helpers.httpx.AsyncClient', mock_async_client_class)
+
+    first = await get_token_prices(["USDC_MINT"], "fake_api_key")
+    second = await get_token_prices(["USDC_MINT"], "fake_api_key")
+
+    assert first == second == {"USDC_MINT": {"value": 1.0}}
+    mock_async_client.get.assert_awaited_once()
+
+async def test_get_token_prices_coalesces_concurrent_calls(mocker):
+    """Tests that concurrent lookups for the same token share one Birdeye request."""
+    mock_response = MagicMock()
+    mock_response.json.return_value = {"success": True, "data": {"value": 2.0}}
+
+    async def slow_get(*args, **kwargs):
+        await asyncio.sleep(0.01)
+        return mock_response
+
+    mock_async_client = AsyncMock()
+    mock_async_client.get.side_effect = slow_get
+
+    mock_async_client_class = MagicMock(return_value=mock_async_client)
+    mocker.patch('solana_helpers.httpx.AsyncClient', mock_async_client_class)
+
+    results = await asyncio.gather(*(get_token_prices(["USDC_MINT"], "fake_api_key") for _ in range(3)))
 
-    prices = await get_token_prices(["some_address"], "YOUR_API_KEY_HERE")
+    assert all(r == {"USDC_MINT": {"value": 2.0}} for r in results)
+    mock_async_client.get.assert_awaited_once()
+    assert not solana_helpers._PRICE_INFLIGHT
+
+
+async def test_get_token_prices_survives_cancelled_joiner(mocker):
+    """Tests that cancelling a caller that joined an in-flight lookup leaves the owner's lookup intact."""
+    mock_response = MagicMock()
+    mock_response.json.return_value = {"success": True, "data": {"value": 3.0}}
+
+    async def slow_get(*args, **kwargs):
+        await asyncio.sleep(0.01)
+        return mock_response
+
+    mock_async_client = AsyncMock()
+    mock_async_client.get.side_effect = slow_get
+    mocker.patch('solana_helpers.httpx.AsyncClient', MagicMock(return_value=mock_async_client))
+
+    owner = asyncio.create_task(get_token_prices(["M"], "fake_api_key"))
+    await asyncio.sleep(0)
+    joiner = asyncio.create_task(get_token_prices(["M"], "fake_api_key"))
+    await asyncio.sleep(0)
+    joiner.cancel()
+
+    assert await owner == {"M": {"value": 3.0}}
+    with pytest.raises(asyncio.CancelledError):
+        await joiner
+    assert solana_helpers._PRICE_CACHE.get("M") == {"value": 3.0}
+
+async def test_get_token_prices_uses_multi_price(mocker):
+    """Tests that several tokens are priced with one multi_price request."""
+    mock_response = MagicMock()
+    mock_response.json.return_value = {
+        "success": True,
+        "data": {"MINT_A": {"value": 1.5}, "MINT_B": None},
+    }
+
+    mock_async_client = AsyncMock()
+    mock_async_client.get.return_value = mock_response
+    mock_async_client_class = MagicMock(return_value=mock_async_client)
+    mocker.patch('solana_helpers.httpx.AsyncClient', mock_async_client_class)
+
+    prices = await get_token_prices(["MINT_A", "MINT_B", "MINT_A"], "fake_api_key")
+
+    assert prices == {"MINT_A": {"value": 1.5}}
+    mock_async_client.get.assert_awaited_once()
+    url = mock_async_client.get.await_args.args[0]
+    params = mock_async_client.get.await_args.kwargs['params']
+    assert url.endswith("/defi/multi_price")
+    assert sorted(params['list_address'].split(",")) == ["MINT_A", "MINT_B"]
+
+async def test_get_token_symbols_persists_lookups(mocker, tmp_path):
+    """Tests that resolved symbols are stored on disk and not requested again."""
+    mocker.patch('solana_helpers.TOKEN_SYMBOLS_DB', str(tmp_path / "symbols.db"))
+    mock_response = MagicMock()
+    mock_response.json.return_value = {"success": True, "data": {"USDC_MINT": {"symbol": "USDC"}, "UNKNOWN": None}}
+
+    mock_async_client = AsyncMock()
+    mock_async_client.get.return_value = mock_response
+    mocker.patch('solana_helpers.httpx.AsyncClient', MagicMock(return_value=mock_async_client))
+
+    assert await get_token_symbols(["USDC_MINT", "UNKNOWN"], "fake_api_key") == {"USDC_MINT": "USDC"}
+
+    # A fresh process reads the symbol back from disk
+    solana_helpers._SYMBOL_CACHE = None
+    assert await get_token_symbols(["USDC_MINT"], "fake_api_key") == {"USDC_MINT": "USDC"}
+    mock_async_client.get.assert_awaited_once()
+
+@pytest.mark.parametrize("api_key", [None, "YOUR_API_KEY_HERE"])
+async def test_get_token_prices_missing_api_key(caplog, api_key):
+    """Tests that an error is logged if the API key is missing or left as the placeholder."""
+    caplog.set_level(logging.ERROR, logger="solana_helpers")
+    prices = await get_token_prices(["some_address"], api_key)
     assert prices == {}
-    assert "Birdeye API key is missing" in caplog.text
+    assert ("solana_helpers", logging.ERROR, "Birdeye API key is missing. Please set it in config.py.") in caplog.record_tuples
 
 
-@pytest.mark.asyncio
-async def test_fetch_and_parse_transactions(mocker):
+async def test_fetch_and_parse_transactions(mocker, async_solana_client):
     """Tests the main transaction fetching and parsing pipeline."""
-    mock_client = AsyncMock()
+    mock_client = async_solana_client('solana_helpers.get_solana_client')
+    mock_client.supports_batch = False
     mock_client.get_signatures_for_address.return_value = {
         "result": [SAMPLE_SIG_INFO]
     }
     # This mock now returns the full structure expected by _fetch_transaction_with_retry
     mock_client.get_transaction.return_value = SAMPLE_TX_RESPONSE
 
-    # Mock the client's context manager
-    mock_async_client_class = MagicMock()
-    mock_async_client_class.return_value.__aenter__.return_value = mock_client
-    mocker.patch('solana_helpers.AsyncCustomSolanaClient', mock_async_client_class)
-
     transactions = await fetch_and_parse_transactions("some_address", "fake_rpc", limit=1)
 
     assert len(transactions) == 1
@@ -113,24 +232,85 @@ async def test_fetch_and_parse_transactions(mocker):
     mock_client.get_signatures_for_address.assert_awaited_once_with("some_address", limit=1)
     mock_client.get_transaction.assert_awaited_once()
 
+    # Interactive scans always go back to the RPC node.
+    assert await fetch_and_parse_transactions("some_address", "fake_rpc", limit=1) == transactions
+    assert mock_client.get_signatures_for_address.await_count == 2
 
-@pytest.mark.asyncio
-async def test_get_token_details(mocker):
-    """Tests fetching details for an SPL token."""
-    mock_client = AsyncMock()
-    mock_client.get_token_supply.return_value = {
-        "result": {"value": {"uiAmountString": "1000000", "decimals": 6}}
-    }
-    mock_client.get_account_info.return_value = {
-        "result": {"value": {"data": {"parsed": {"type": "mint", "info": {
-            "mintAuthority": "AuthAddress",
-            "freezeAuthority": "FreezeAddress"
-        }}}}}
-    }
 
-    mock_async_client_class = MagicMock()
-    mock_async_client_class.return_value.__aenter__.return_value = mock_client
-    mocker.patch('solana_helpers.AsyncCustomSolanaClient', mock_async_client_class)
+async def test_fetch_and_parse_new_transactions_uses_cache(async_solana_client):
+    """Tests that a scheduled fetch reuses a recent result for the same last signature only when asked to."""
+    mock_client = async_solana_client('solana_helpers.get_solana_client')
+    mock_client.supports_batch = False
+    mock_client.get_signatures_for_address.return_value = {"result": [SAMPLE_SIG_INFO]}
+    mock_client.get_transaction.return_value = SAMPLE_TX_RESPONSE
+
+    transactions, newest = await fetch_and_parse_new_transactions("some_address", "fake_rpc", use_cache=True)
+    assert newest == 'dummy_sig_123'
+    assert [tx['signature'] for tx in transactions] == ['dummy_sig_123']
+
+    assert await fetch_and_parse_new_transactions("some_address", "fake_rpc", use_cache=True) == (transactions, newest)
+    mock_client.get_signatures_for_address.assert_awaited_once()
+
+    await fetch_and_parse_new_transactions("some_address", "fake_rpc")
+    assert mock_client.get_signatures_for_address.await_count == 2
+
+
+async def test_fetch_and_parse_transactions_batches_calls(mocker, async_solana_client):
+    """Tests that transactions are fetched in batches and a failed batch falls back to single calls."""
+    mocker.patch('solana_helpers._TX_BATCH_SIZE', 2)
+    sig_infos = [dict(SAMPLE_SIG_INFO, signature=f"sig_{i}") for i in range(3)]
+
+    mock_client = async_solana_client('solana_helpers.get_solana_client')
+    mock_client.supports_batch = True
+    mock_client.get_signatures_for_address.return_value = {"result": sig_infos}
+    mock_client.get_transactions.side_effect = [[SAMPLE_TX_RESPONSE, SAMPLE_TX_RESPONSE], Exception("batch rejected")]
+    mock_client.get_transaction.return_value = SAMPLE_TX_RESPONSE
+
+    transactions = await fetch_and_parse_transactions("some_address", "fake_rpc", limit=3)
+
+    assert [tx['signature'] for tx in transactions] == ["sig_0", "sig_1", "sig_2"]
+    assert mock_client.get_transactions.await_count == 2
+    mock_client.get_transaction.assert_awaited_once_with("sig_2", cache=False)
+
+
+async def test_fetch_and_parse_transactions_pages_block_range(mocker, async_solana_client):
+    """Tests that block-range scans page through history and stop below the start block."""
+    first_page = [dict(SAMPLE_SIG_INFO, signature=f"sig_{slot}", slot=slot) for slot in range(2000, 1000, -1)]
+    second_page = [dict(SAMPLE_SIG_INFO, signature=f"sig_{slot}", slot=slot) for slot in range(1000, 990, -1)]
+
+    mock_client = async_solana_client('solana_helpers.get_solana_client')
+    mock_client.supports_batch = False
+    mock_client.get_signatures_for_address.side_effect = [{"result": first_page}, {"result": second_page}]
+    mock_client.get_transaction.return_value = SAMPLE_TX_RESPONSE
+
+    transactions = await fetch_and_parse_transactions("some_address", "fake_rpc", limit=None, start_block=995, end_block=1500)
+
+    assert [tx['signature'] for tx in transactions] == [f"sig_{slot}" for slot in range(1500, 994, -1)]
+    assert mock_client.get_signatures_for_address.await_count == 2
+    assert mock_client.get_signatures_for_address.await_args.kwargs['before'] == "sig_1001"
+
+
+async def test_fetch_and_parse_transactions_discards_partial_history(mocker, async_solana_client):
+    """Tests that a failing later page yields no rows."""
+    first_page = [dict(SAMPLE_SIG_INFO, signature=f"sig_{slot}", slot=slot) for slot in range(2000, 1000, -1)]
+
+    mock_client = async_solana_client('solana_helpers.get_solana_client')
+    mock_client.supports_batch = False
+    mock_client.get_signatures_for_address.side_effect = [{"result": first_page}, Exception("rpc down")]
+    mock_client.get_transaction.return_value = SAMPLE_TX_RESPONSE
+
+    transactions = await fetch_and_parse_transactions("some_address", "fake_rpc", limit=None, start_block=1, end_block=2000)
+
+    assert transactions == []
+
+
+async def test_get_token_details(async_solana_client):
+    """Tests fetching details for an SPL token."""
+    async_solana_client(
+        'solana_helpers.get_solana_client',
+        get_token_supply=_TOKEN_SUPPLY_OK,
+        get_account_info=_MINT_ACCOUNT_INFO,
+    )
 
     details = await get_token_details("token_address", "fake_rpc")
 
@@ -140,32 +320,38 @@ async def test_get_token_details(mocker):
     assert details['freeze_authority'] == "FreezeAddress"
 
 
-@pytest.mark.asyncio
-async def test_get_wallet_balance(mocker):
+async def test_get_token_details_refetches_supply(async_solana_client):
+    """Tests that supply is fetched on every call while mint metadata comes from the cache."""
+    client = async_solana_client('solana_helpers.get_solana_client')
+    client.get_token_supply = AsyncMock(side_effect=[
+        _TOKEN_SUPPLY_OK,
+        {"result": {"value": {"uiAmountString": "900000", "decimals": 6}}},
+    ])
+    client.get_account_info = AsyncMock(return_value=_MINT_ACCOUNT_INFO)
+
+    await get_token_details("token_address", "fake_rpc")
+    details = await get_token_details("token_address", "fake_rpc")
+
+    assert details == {'supply': "900000", 'decimals': 6, 'mint_authority': "AuthAddress", 'freeze_authority': "FreezeAddress"}
+    assert client.get_token_supply.await_count == 2
+    client.get_account_info.assert_awaited_once()
+
+
+async def test_get_wallet_balance(mocker, async_solana_client, areturn):
     """Tests the wallet balance formatting logic."""
-    # Mock client calls
-    mock_client = AsyncMock()
-    # SOL balance
-    mock_client.get_account_info.return_value = {"result": {"value": {"lamports": 1.5 * 1_000_000_000}}}
-    # Token balances
-    mock_client.get_token_accounts_by_owner.return_value = {
-        "result": {"value": [{
-            "account": {"data": {"parsed": {"info": {
-                "tokenAmount": {"uiAmountString": "123.45"},
-                "mint": "USDC_MINT"
-            }}}}
-        }]}
-    }
-    mock_async_client_class = MagicMock()
-    mock_async_client_class.return_value.__aenter__.return_value = mock_client
-    mocker.patch('solana_helpers.AsyncCustomSolanaClient', mock_async_client_class)
+    # Mock client calls: SOL balance and token balances
+    async_solana_client(
+        'solana_helpers.get_solana_client',
+        get_account_info=_SOL_ACCOUNT_INFO,
+        get_token_accounts_by_owner=_TOKEN_ACCOUNTS_OK,
+    )
 
     # Mock price calls
     mock_prices = {
         "So11111111111111111111111111111111111111112": {"value": 200.0},
         "USDC_MINT": {"value": 1.0, "symbol": "USDC"}
     }
-    mocker.patch('solana_helpers.get_token_prices', AsyncMock(return_value=mock_prices))
+    mocker.patch('solana_helpers.get_token_prices', areturn(mock_prices))
 
     balance_msg = await get_wallet_balance("wallet_address", "fake_rpc", "fake_api_key")
 